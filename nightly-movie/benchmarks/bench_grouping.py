@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""Benchmark grouping a night of OVRO-LWA file names into time windows.
+
+A synthetic night of file names is generated with one integration every
+10 seconds in each subband.
+
+Usage:
+    python benchmarks/bench_grouping.py [--hours H] [--subbands N] [--legacy]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+from astropy import units
+from astropy.time import Time, TimeDelta
+
+from nightly_movie import utils
+
+SUBBANDS = [f"{freq}MHz" for freq in range(18, 87, 5)] + ["13MHz", "87MHz"]
+
+
+def synthetic_night(hours: float, nsubbands: int, date: str = "2024-03-23"):
+    start = np.datetime64(f"{date}T00:00:00")
+    times = start + np.arange(0, int(hours * 3600), 10).astype("timedelta64[s]")
+
+    filenames = []
+    for timeval in times.astype(object):
+        stamp = timeval.strftime("%Y%m%d_%H%M%S")
+        for band in SUBBANDS[:nsubbands]:
+            filenames.append(
+                Path(f"{band}/{date}/{timeval.hour:02d}/{stamp}_{band}.ms")
+            )
+    return filenames
+
+
+def legacy_group_files(filenames, time_window):
+    """The per-file Time implementation group_files replaced."""
+    times_to_fnames = dict()
+    for fname in filenames:
+        groups = utils.TIME_REGEX.match(fname.name).groupdict()
+        date, hms = groups["date"], groups["hms"]
+        timeval = Time(
+            f"{date[:4]}-{date[4:6]}-{date[6:8]}T{hms[:2]}:{hms[2:4]}:{hms[4:6]}",
+            format="isot",
+        )
+        times_to_fnames.setdefault(timeval, []).append(fname)
+
+    time_array = Time(sorted(times_to_fnames.keys()))
+    grouped_data = dict()
+    group_start_ind = 0
+    while group_start_ind < len(time_array):
+        group_inds = (
+            np.nonzero(
+                time_array[group_start_ind:] - time_array[group_start_ind]
+                <= time_window
+            )[0]
+            + group_start_ind
+        )
+        central_time = np.mean(time_array[group_inds])
+        grouped_data[central_time] = []
+        for ind in group_inds:
+            grouped_data[central_time] += times_to_fnames[time_array[ind]]
+        group_start_ind = group_inds[-1] + 1
+
+    return grouped_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, default=12.0)
+    parser.add_argument("--subbands", type=int, default=16)
+    parser.add_argument("--interval", type=float, default=5.0)
+    parser.add_argument(
+        "--legacy", action="store_true", help="Also time the old implementation."
+    )
+    args = parser.parse_args()
+
+    filenames = synthetic_night(args.hours, args.subbands)
+    time_window = TimeDelta(args.interval * units.min)
+    print(f"{len(filenames)} files, {args.interval} minute windows")
+
+    tstart = time.perf_counter()
+    grouped = utils.group_files(filenames, time_window)
+    print(f"group_files: {len(grouped)} groups in {time.perf_counter() - tstart:.3f}s")
+
+    if args.legacy:
+        tstart = time.perf_counter()
+        legacy = legacy_group_files(filenames, time_window)
+        print(
+            f"legacy group_files: {len(legacy)} groups in "
+            f"{time.perf_counter() - tstart:.3f}s"
+        )
+        # the legacy comparison of Time differences can round an integration
+        # exactly time_window after the start of a window out of that window.
+        matching = sum(
+            files1 == files2
+            for files1, files2 in zip(grouped.values(), legacy.values())
+        )
+        print(f"{matching} of {len(grouped)} groups identical to legacy")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""Benchmark rendering snapshot plots into movie frames.
+
+Synthetic Stokes I and V images are written for a sequence of times, with
+the phase center following zenith like the wsclean images of a night. The
+frames are rendered with a new figure for every frame, as plot_snapshot
+used to, and with one SnapshotRenderer reused for every frame.
+
+Usage:
+    python benchmarks/bench_render.py [--frames N] [--size PIXELS] [--downsample F ...]
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+
+from nightly_movie.render import SnapshotRenderer
+
+
+def make_snapshots(root: Path, nframes: int, size: int) -> list:
+    rng = np.random.default_rng(0)
+    snapshots = []
+    for ind in range(nframes):
+        header = fits.Header()
+        # 5 minute windows move the zenith by 1.25 degrees of RA
+        axes = [
+            ("RA---SIN", (180.0 + 1.25 * ind) % 360, -0.03125, size / 2),
+            ("DEC--SIN", 37.2, 0.03125, size / 2),
+            ("FREQ", 6.0e7, 2.4e7, 1),
+            ("STOKES", 1, 1, 1),
+        ]
+        for axis, (ctype, crval, cdelt, crpix) in enumerate(axes, start=1):
+            header[f"CTYPE{axis}"] = ctype
+            header[f"CRVAL{axis}"] = crval
+            header[f"CDELT{axis}"] = cdelt * 4096 / size
+            header[f"CRPIX{axis}"] = crpix
+        minutes = 5 * ind
+        header["DATE-OBS"] = (
+            f"2024-03-23T{3 + minutes // 60:02d}:{minutes % 60:02d}:06.0"
+        )
+        header["TELESCOP"] = "OVRO_MMA"
+
+        filenames = []
+        for pol in ["I", "V"]:
+            filename = root / f"20240323_{ind:06d}_highband-{pol}-dirty.fits"
+            data = rng.normal(0, 5, size=(1, 1, size, size)).astype(np.float32)
+            fits.writeto(filename, data, header)
+            filenames.append(str(filename))
+        snapshots.append(filenames)
+
+    return snapshots
+
+
+def run(snapshots: list, make_renderer, reuse: bool) -> float:
+    renderer = make_renderer()
+    if reuse:
+        # build the figure outside of the timing
+        renderer.render(snapshots[0])
+
+    tstart = time.perf_counter()
+    for filenames in snapshots:
+        if not reuse:
+            renderer = make_renderer()
+        renderer.render(filenames)
+    return len(snapshots) / (time.perf_counter() - tstart)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=10)
+    parser.add_argument("--size", type=int, default=4096)
+    parser.add_argument("--downsample", type=int, nargs="*", default=[1, 4])
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="bench_render"))
+    try:
+        snapshots = make_snapshots(root, args.frames, args.size)
+        print(f"{args.frames} frames from {args.size}x{args.size} images")
+
+        # warm up the ephemeris and source lookups
+        SnapshotRenderer(True).render(snapshots[0])
+
+        fps = run(snapshots, lambda: SnapshotRenderer(True), reuse=False)
+        print(f"{'new figure per frame':>32}: {fps:6.2f} frames/s")
+        for downsample in args.downsample:
+            fps = run(snapshots, lambda: SnapshotRenderer(True, downsample), reuse=True)
+            print(
+                f"{f'reused figure, downsample={downsample}':>32}: {fps:6.2f} frames/s"
+            )
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""Benchmark the strategies for making working copies of MS directories.
+
+A set of synthetic MS-like directories is written under --src and each
+strategy copies them into --dst. Point --src and --dst at the real
+filesystems (e.g. Lustre and node-local scratch) to compare them there.
+
+Usage:
+    python benchmarks/bench_staging.py --src DIR --dst DIR [--ndirs N] [--size-mb MB]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from nightly_movie import staging
+
+
+def make_data(root: Path, ndirs: int, size_mb: float, nfiles: int = 8):
+    filenames = []
+    for ind in range(ndirs):
+        msname = root / f"20240323_030006_{18 + ind:02d}MHz.ms"
+        msname.mkdir(parents=True)
+        for file_ind in range(nfiles):
+            with open(msname / f"table.f{file_ind}", "wb") as datafile:
+                datafile.write(os.urandom(int(size_mb * 1024**2 / nfiles)))
+        filenames.append(msname)
+    return filenames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--src", type=Path, default=None)
+    parser.add_argument("--dst", type=Path, default=None)
+    parser.add_argument("--ndirs", type=int, default=16)
+    parser.add_argument("--size-mb", type=float, default=64.0)
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 4, 16])
+    parser.add_argument("--strategies", nargs="*", default=["reflink", "copy", "rsync"])
+    args = parser.parse_args()
+
+    src = Path(tempfile.mkdtemp(dir=args.src, prefix="bench_staging_src"))
+    dst = Path(tempfile.mkdtemp(dir=args.dst, prefix="bench_staging_dst"))
+    try:
+        filenames = make_data(src, args.ndirs, args.size_mb)
+        total_mb = args.ndirs * args.size_mb
+        print(f"{args.ndirs} directories, {total_mb:.0f} MB total: {src} -> {dst}")
+
+        for strategy in args.strategies:
+            for workers in args.workers:
+                tstart = time.perf_counter()
+                try:
+                    staging.stage_files(
+                        filenames, dst, strategy=strategy, workers=workers
+                    )
+                except Exception as err:
+                    print(f"{strategy:>8} workers={workers:<3} unavailable: {err!r}")
+                    break
+                seconds = time.perf_counter() - tstart
+                print(
+                    f"{strategy:>8} workers={workers:<3} {seconds:7.2f}s "
+                    f"{total_mb / seconds:8.1f} MB/s"
+                )
+                for outname in dst.iterdir():
+                    shutil.rmtree(outname)
+    finally:
+        shutil.rmtree(src)
+        shutil.rmtree(dst)
+
+
+if __name__ == "__main__":
+    main()
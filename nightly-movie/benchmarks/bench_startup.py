@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""Benchmark the import time of nightly_movie modules.
+
+Each module is imported in a fresh interpreter with ``python -X importtime``
+and the cumulative import time and the slowest dependencies are reported.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat N] [--top N] [module ...]
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+IMPORTTIME_REGEX = re.compile(
+    r"^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|(?P<indent>\s+)(?P<name>\S+)$"
+)
+
+
+def import_times(module: str):
+    """Import module in a new interpreter and parse the -X importtime output.
+
+    Returns
+    -------
+    total : float
+        Cumulative import time of module in seconds.
+    cumulative : dict
+        The cumulative import time in seconds of every other top level package imported.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    cumulative = {}
+    total = 0.0
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_REGEX.match(line)
+        if match is None:
+            continue
+        name = match.group("name")
+        seconds = int(match.group("cumulative")) / 1e6
+        if name == module:
+            total = seconds
+        top_level = name.split(".")[0]
+        if top_level == module.split(".")[0]:
+            continue
+        cumulative[top_level] = max(cumulative.get(top_level, 0.0), seconds)
+
+    return total, cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        default=["nightly_movie", "nightly_movie.utils", "nightly_movie.cli"],
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        runs = [import_times(module) for _ in range(args.repeat)]
+        totals = [total for total, _ in runs]
+        print(
+            f"{module}: median {statistics.median(totals):.3f}s "
+            f"(min {min(totals):.3f}s, max {max(totals):.3f}s, {args.repeat} runs)"
+        )
+
+        _, cumulative = runs[-1]
+        slowest = sorted(cumulative.items(), key=lambda x: x[1], reverse=True)
+        for name, seconds in slowest[: args.top]:
+            print(f"    {name:<30} {seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
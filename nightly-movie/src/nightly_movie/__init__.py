@@ -3,7 +3,30 @@
 # All rights reserved.
 
 
-from . import (
-    beam,  # noqa: F401
-    utils,  # noqa: F401
-)
+import importlib
+
+# submodules are imported on first access so that e.g. nightly_movie.utils
+# does not also pay for astropy.coordinates through nightly_movie.beam
+__all__ = [
+    "beam",
+    "calcache",
+    "catalog",
+    "checkpoint",
+    "ephemeris",
+    "filecatalog",
+    "imaging",
+    "movie",
+    "msmeta",
+    "pipeline",
+    "render",
+    "skymodel",
+    "staging",
+    "utils",
+    "workers",
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
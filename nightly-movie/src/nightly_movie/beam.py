@@ -1,10 +1,22 @@
-import glob
 import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
 
 import numpy as np
-from astropy.coordinates import AltAz, Angle, EarthLocation, SkyCoord
+from astropy.coordinates import AltAz, Angle, EarthLocation
 
 BEAM_FILE_PATH = os.path.abspath("/opt/beam")
+# uncompressed copies of the beam .npz files which can be memory-mapped,
+# about 512 MB per beam frequency. Node-local temporary space by default
+# (TMPDIR on the cluster), never the quota-limited home directories.
+BEAM_CACHE_PATH = os.environ.get(
+    "NIGHTLY_MOVIE_BEAM_CACHE",
+    os.path.join(tempfile.gettempdir(), f"nightly_movie_beam_{os.getuid()}"),
+)
+
+BEAM_FILE_REGEX = re.compile(r"^beamIQUV_(?P<freq>\d+(\.\d*)?)\.npz$")
 
 OVRO_LOCATION = EarthLocation.from_geodetic(
     lat=Angle("37.239777271d"),
@@ -13,6 +25,299 @@ OVRO_LOCATION = EarthLocation.from_geodetic(
 )
 
 
+class GridIndex:
+    """Nearest-neighbour index over a grid of (azimuth, elevation) values.
+
+    The KD-tree is built once per grid, after which lookups are O(log n)
+    instead of a distance computation and sort over every grid cell.
+    Cells with non-finite coordinates (e.g. below the horizon) are skipped.
+
+    Parameters
+    ----------
+    azelgrid : np.ndarray
+        Array of shape (2, N, M) holding the azimuth and elevation in degrees
+        of every grid cell.
+    """
+
+    def __init__(self, azelgrid: np.ndarray):
+        from scipy.spatial import cKDTree
+
+        points = np.asarray(azelgrid).reshape(2, -1).T
+        finite = np.all(np.isfinite(points), axis=1)
+        if finite.all():
+            self.flat_index = None
+        else:
+            self.flat_index = np.flatnonzero(finite)
+            points = points[finite]
+
+        self.tree = cKDTree(points, balanced_tree=False, compact_nodes=False)
+
+    def query(self, az, el) -> np.ndarray:
+        """Find the flat grid index closest to each (az, el) pair.
+
+        Parameters
+        ----------
+        az : float | np.ndarray
+            Azimuth in degrees.
+        el : float | np.ndarray
+            Elevation in degrees, broadcastable against az.
+
+        Returns
+        -------
+        np.ndarray
+            Flat indices into the grid with the broadcast shape of az and el.
+        """
+        az, el = np.broadcast_arrays(np.asarray(az, float), np.asarray(el, float))
+        _, index = self.tree.query(np.column_stack([az.ravel(), el.ravel()]))
+        if self.flat_index is not None:
+            index = self.flat_index[index]
+        return index.reshape(az.shape)
+
+
+class BeamStore:
+    """Memory-mapped access to the beam simulation files.
+
+    The compressed beamIQUV_<freq>.npz files are unpacked once into
+    uncompressed .npy files under cache_path, which are then opened with
+    mmap. Every Beam in a process, and every process on a node, shares the
+    same pages rather than each decompressing its own ~1 GB copy.
+
+    The unpacked I, Q, U and V grids of a 4096 x 4096 beam take about 512 MB
+    of disk per beam frequency, so cache_path should be node-local scratch
+    with room for every frequency used, not a home directory.
+
+    Parameters
+    ----------
+    beam_path : str
+        Directory holding azelgrid.npy and the beamIQUV_<freq>.npz files.
+    cache_path : str
+        Directory to write the uncompressed per-polarization .npy files,
+        about 512 MB per beam frequency.
+    maxsize : int
+        Number of beam frequencies to keep open at once.
+    """
+
+    def __init__(self, beam_path: str, cache_path: str, maxsize: int = 8):
+        self.beam_path = beam_path
+        self.cache_path = cache_path
+        self.maxsize = maxsize
+
+        self._lock = threading.Lock()
+        self._beams = OrderedDict()
+        self._azelgrid = None
+        self._grid_index = None
+
+    @property
+    def azelgrid(self) -> np.ndarray:
+        """The (2, N, N) grid of azimuth, elevation values."""
+        with self._lock:
+            if self._azelgrid is None:
+                self._azelgrid = np.load(
+                    os.path.join(self.beam_path, "azelgrid.npy"), mmap_mode="r"
+                )
+        return self._azelgrid
+
+    @property
+    def grid_index(self) -> GridIndex:
+        """Nearest-neighbour index of the azelgrid, built on first use."""
+        azelgrid = self.azelgrid
+        with self._lock:
+            if self._grid_index is None:
+                self._grid_index = GridIndex(azelgrid)
+        return self._grid_index
+
+    def load(self, beamfile: str) -> dict:
+        """Return memory-mapped I, Q, U and V arrays for a beam .npz file."""
+        beamfile = os.path.abspath(beamfile)
+        with self._lock:
+            if beamfile in self._beams:
+                self._beams.move_to_end(beamfile)
+                return self._beams[beamfile]
+
+            beam = {
+                pol: np.load(self._uncompressed(beamfile, pol), mmap_mode="r")
+                for pol in "IQUV"
+            }
+            self._beams[beamfile] = beam
+            while len(self._beams) > self.maxsize:
+                self._beams.popitem(last=False)
+
+        return beam
+
+    def _uncompressed(self, beamfile: str, pol: str) -> str:
+        """Get the uncompressed .npy path of one polarization, writing it if stale."""
+        stem = os.path.splitext(os.path.basename(beamfile))[0]
+        cached = os.path.join(self.cache_path, f"{stem}_{pol}.npy")
+
+        if os.path.exists(cached) and os.path.getmtime(cached) >= os.path.getmtime(
+            beamfile
+        ):
+            return cached
+
+        os.makedirs(self.cache_path, exist_ok=True)
+        # write to a temporary file first so other processes
+        # never map a partially written array
+        fd, tmpname = tempfile.mkstemp(dir=self.cache_path, suffix=".npy")
+        try:
+            with os.fdopen(fd, "wb") as tmpfile, np.load(beamfile) as beamIQUV:
+                np.save(tmpfile, beamIQUV[pol])
+            os.replace(tmpname, cached)
+        except BaseException:
+            os.unlink(tmpname)
+            raise
+
+        return cached
+
+
+_BEAM_STORES = {}
+_BEAM_STORES_LOCK = threading.Lock()
+
+
+def get_beam_store(beam_path: str = None, cache_path: str = None) -> BeamStore:
+    """Get the process-wide BeamStore for a beam directory.
+
+    Defaults to BEAM_FILE_PATH and BEAM_CACHE_PATH.
+    """
+    beam_path = os.path.abspath(beam_path or BEAM_FILE_PATH)
+    cache_path = os.path.abspath(cache_path or BEAM_CACHE_PATH)
+
+    with _BEAM_STORES_LOCK:
+        key = (beam_path, cache_path)
+        if key not in _BEAM_STORES:
+            _BEAM_STORES[key] = BeamStore(beam_path, cache_path)
+        return _BEAM_STORES[key]
+
+
+class BeamModel:
+    """Frequency interpolated beam model over all available beam files.
+
+    The beam directory is indexed once into a sorted array of frequencies.
+    Beam values at any frequency are linearly interpolated between the two
+    bracketing beam files, and are clamped to the nearest file outside the
+    simulated range.
+
+    Parameters
+    ----------
+    store : BeamStore
+        The store used to access the beam files.
+    """
+
+    def __init__(self, store: BeamStore):
+        self.store = store
+
+        beamfiles = {}
+        for name in os.listdir(store.beam_path):
+            match = BEAM_FILE_REGEX.match(name)
+            if match is not None:
+                beamfiles[float(match.group("freq"))] = os.path.join(
+                    store.beam_path, name
+                )
+        if len(beamfiles) == 0:
+            raise FileNotFoundError(f"No beamIQUV files found in {store.beam_path}")
+
+        self.freqs = np.array(sorted(beamfiles))
+        self.beamfiles = [beamfiles[freq] for freq in self.freqs]
+
+    def bracket(self, freqs):
+        """Find the beam files bracketing each frequency.
+
+        Parameters
+        ----------
+        freqs : float | np.ndarray
+            Frequencies in MHz.
+
+        Returns
+        -------
+        lower : np.ndarray
+            Index of the beam file below each frequency.
+        upper : np.ndarray
+            Index of the beam file above each frequency.
+        weight : np.ndarray
+            Linear interpolation weight of the upper beam file.
+        """
+        freqs = np.asarray(freqs, dtype=float)
+        if self.freqs.size == 1:
+            zeros = np.zeros(freqs.shape, dtype=int)
+            return zeros, zeros, np.zeros(freqs.shape)
+
+        upper = np.clip(np.searchsorted(self.freqs, freqs), 1, self.freqs.size - 1)
+        lower = upper - 1
+        weight = (freqs - self.freqs[lower]) / (self.freqs[upper] - self.freqs[lower])
+
+        return lower, upper, np.clip(weight, 0, 1)
+
+    def grid(self, freq: float) -> dict:
+        """Get the full I, Q, U and V grids at a single frequency.
+
+        Frequencies matching a beam file return its memory-mapped arrays,
+        otherwise new interpolated arrays are computed.
+        """
+        lower, upper, weight = (x.item() for x in self.bracket(freq))
+        if weight == 0:
+            return self.store.load(self.beamfiles[lower])
+        if weight == 1:
+            return self.store.load(self.beamfiles[upper])
+
+        lower_beam = self.store.load(self.beamfiles[lower])
+        upper_beam = self.store.load(self.beamfiles[upper])
+        return {
+            pol: (1 - weight) * lower_beam[pol] + weight * upper_beam[pol]
+            for pol in "IQUV"
+        }
+
+    def srcIQUV(self, az, el, freqs) -> np.ndarray:
+        """Compute beam scaling factors for many sources and frequencies at once.
+
+        Only the grid cells nearest each source are read from the beam files,
+        and every beam file is read at most once.
+
+        Parameters
+        ----------
+        az : float | np.ndarray
+            Azimuth in degrees.
+        el : float | np.ndarray
+            Elevation in degrees, broadcastable against az.
+        freqs : float | np.ndarray
+            Frequencies in MHz.
+
+        Returns
+        -------
+        np.ndarray
+            [I, Q, U, V] flux factors with shape (4, *freqs.shape, *az.shape)
+        """
+        index = self.store.grid_index.query(az, el)
+        lower, upper, weight = self.bracket(freqs)
+
+        needed = np.unique(np.concatenate([lower.ravel(), upper.ravel()]))
+        values = np.zeros((self.freqs.size, 4) + index.shape)
+        for ind in needed:
+            beam = self.store.load(self.beamfiles[ind])
+            for pol_ind, pol in enumerate("IQUV"):
+                values[ind, pol_ind] = beam[pol].flat[index]
+
+        weight = weight.reshape(weight.shape + (1,) * (index.ndim + 1))
+        scale = (1 - weight) * values[lower] + weight * values[upper]
+
+        # move the polarization axis first
+        return np.moveaxis(scale, lower.ndim, 0)
+
+
+_BEAM_MODELS = {}
+
+
+def get_beam_model(beam_path: str = None, cache_path: str = None) -> BeamModel:
+    """Get the process-wide BeamModel for a beam directory.
+
+    Defaults to BEAM_FILE_PATH and BEAM_CACHE_PATH.
+    """
+    store = get_beam_store(beam_path, cache_path)
+
+    with _BEAM_STORES_LOCK:
+        if store not in _BEAM_MODELS:
+            _BEAM_MODELS[store] = BeamModel(store)
+        return _BEAM_MODELS[store]
+
+
 class Beam:
     """
     For loading and returning LWA dipole beam values (derived from DW beam simulations) on the ASTM.
@@ -24,55 +329,47 @@ class Beam:
         self.obstime = obstime
         self.altaz = AltAz(location=OVRO_LOCATION, obstime=self.obstime)
 
-        # load 4096x4096 grid of azimuth,elevation values
-        self.azelgrid = np.load(BEAM_FILE_PATH + "/azelgrid.npy")
+        # beam values at CRFREQ are interpolated from the closest beam files
+        self.model = get_beam_model()
+
+        # 4096x4096 grid of azimuth,elevation values
+        self.azelgrid = self.model.store.azelgrid
         self.gridsize = self.azelgrid.shape[-1]
-        # load 4096x4096 grid of IQUV values, for given msfile CRFREQ
-        beamIQUVfile = BEAM_FILE_PATH + "/beamIQUV_" + str(CRFREQ) + ".npz"
-        if not os.path.exists(beamIQUVfile):
-            print(
-                f"Beam .npz file does not exist at {CRFREQ}. Using closest existing frequency beam file."
-            )
-            beamfiles = np.sort(glob.glob(f"{BEAM_FILE_PATH}/beamIQUV_*.npz"))
-            freqs_beamfiles = np.char.strip(
-                np.char.strip(beamfiles, chars="/opt/beam/beamIQUV_"), chars=".npz"
-            ).astype(float)
-            beamIQUVfile = beamfiles[np.argmin(np.abs(freqs_beamfiles - CRFREQ))]
-        beamIQUV = np.load(beamIQUVfile)
-        self.Ibeam = beamIQUV["I"]
-        self.Qbeam = beamIQUV["Q"]
-        self.Ubeam = beamIQUV["U"]
-        self.Vbeam = beamIQUV["V"]
+        self._beamIQUV = None
+
+    def _grid(self, pol):
+        if self._beamIQUV is None:
+            self._beamIQUV = self.model.grid(self.freq)
+        return self._beamIQUV[pol]
+
+    @property
+    def Ibeam(self):
+        return self._grid("I")
+
+    @property
+    def Qbeam(self):
+        return self._grid("Q")
+
+    @property
+    def Ubeam(self):
+        return self._grid("U")
+
+    @property
+    def Vbeam(self):
+        return self._grid("V")
 
     def srcIQUV(self, az, el):
         """Compute beam scaling factor
         Args:
-            az: azimuth in degrees
-            el: elevation in degrees
+            az: azimuth in degrees, scalar or array for many sources at once
+            el: elevation in degrees, scalar or array for many sources at once
 
         Returns: [I,Q,U,V] flux factors, where for an unpolarized source [I,Q,U,V] = [1,0,0,0]
+            Each factor has the broadcast shape of az and el.
 
         """
-
-        def knn_search(arr, grid):
-            """
-            Find 'nearest neighbor' of array of points in multi-dimensional grid
-            Source: glowingpython.blogspot.com/2012/04/k-nearest-neighbor-search.html
-            """
-            gridsize = grid.shape[1]
-            dists = np.sqrt(((grid - arr[:, :gridsize]) ** 2.0).sum(axis=0))
-            return np.argsort(dists)[0]
-
-        # index where grid equals source az el values
-        index = knn_search(
-            np.array([[az], [el]]),
-            self.azelgrid.reshape(2, self.gridsize * self.gridsize),
-        )
-        Ifctr = self.Ibeam.flat[index]
-        Qfctr = self.Qbeam.flat[index]
-        Ufctr = self.Ubeam.flat[index]
-        Vfctr = self.Vbeam.flat[index]
-        return Ifctr, Qfctr, Ufctr, Vfctr
+        Ifctr, Qfctr, Ufctr, Vfctr = self.model.srcIQUV(az, el, self.freq)
+        return Ifctr[()], Qfctr[()], Ufctr[()], Vfctr[()]
 
     def apply_beam(self, source):
         """Apply beam scaling factors to the source.
@@ -83,19 +380,70 @@ class Beam:
         np.ndarray:
             Apparent [I, Q, U, V] values of source flux
         """
-        altaz = SkyCoord.from_name(source["label"]).transform_to(self.altaz)
-        if altaz.alt.deg >= 10:
-            scale = np.array(self.srcIQUV(altaz.az.deg, altaz.alt.deg))
-        else:
-            scale = np.ones(4)
+        return self.apply_beams([source])[0]
+
+    def apply_beams(self, sources):
+        """Apply beam scaling factors to many sources at once.
+
+        Sources below 10 degrees elevation are not scaled.
+
+        Returns
+        -------
+        np.ndarray:
+            Apparent [I, Q, U, V] values of each source flux, shape (sources, 4)
+        """
+        return apparent_fluxes(sources, self.obstime, self.freq, model=self.model)[0]
+
+
+def apparent_fluxes(sources, obstime, freqs, model: BeamModel = None) -> np.ndarray:
+    """Beam attenuated fluxes of many sources at many frequencies at once.
+
+    The sources are transformed to alt/az once, and each beam file is read
+    once for every frequency. Sources below 10 degrees elevation are not scaled.
+
+    Parameters
+    ----------
+    sources : List[dict]
+        Sources with a label, flux, alpha (spectral index) and ref_freq in MHz.
+    obstime : Time
+        A single time.
+    freqs : float | np.ndarray
+        Frequencies in MHz.
+    model : BeamModel
+        The beam. The one of get_beam_model if None.
+
+    Returns
+    -------
+    np.ndarray
+        Apparent [I, Q, U, V] values of each source flux, shape (freqs, sources, 4)
+    """
+    from .ephemeris import SourceVisibility
+
+    if model is None:
+        model = get_beam_model()
+    freqs = np.atleast_1d(np.asarray(freqs, dtype=float))
+
+    visibility = SourceVisibility(obstime, [source["label"] for source in sources])
+    az, alt = visibility.az[:, 0], visibility.alt[:, 0]
+
+    scale = np.ones((freqs.size, len(sources), 4))
+    high = alt >= 10
+    if np.any(high):
+        # (pol, freqs, sources) -> (freqs, sources, pol)
+        scale[:, high] = np.moveaxis(model.srcIQUV(az[high], alt[high], freqs), 0, -1)
 
-        return (
-            _flux80_47(source["flux"], source["alpha"], self.freq, source["ref_freq"])
-            * scale
-        )
+    flux = _flux80_47(
+        np.array([source["flux"] for source in sources]),
+        np.array([source["alpha"] for source in sources]),
+        freqs[:, np.newaxis],
+        np.array([source["ref_freq"] for source in sources]),
+    )
+    return flux[..., np.newaxis] * scale
 
 
 def _flux80_47(flux_hi, sp, output_freq, ref_freq):
     # given a flux at 80 MHz and a sp_index,
     # return the flux at MS center-frequency.
-    return float(flux_hi) * 10 ** (sp * np.log10(output_freq / ref_freq))
+    return np.asarray(flux_hi, dtype=float) * 10 ** (
+        sp * np.log10(output_freq / ref_freq)
+    )
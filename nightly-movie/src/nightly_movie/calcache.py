@@ -0,0 +1,196 @@
+# -*- mode: python; coding: utf-8 -*-
+# Copyright (c) 2024, Owens Valley Radio Observatory Long Wavelength Array
+# All rights reserved.
+
+import hashlib
+import json
+import shutil
+import threading
+import warnings
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+from .checkpoint import write_json
+
+DATE_FORMAT = "%Y%m%d"
+
+
+def normalize_bad_ants(bad_ants: Union[str, Iterable]) -> List[str]:
+    """The flagged antennas as a sorted list, e.g. "12,3" -> ["3", "12"]."""
+    if isinstance(bad_ants, str):
+        bad_ants = bad_ants.split(",")
+    names = {str(ant).strip() for ant in bad_ants}
+    names.discard("")
+    return sorted(names, key=lambda name: (len(name), name))
+
+
+def model_hash(sources: List[dict]) -> str:
+    """A hash of the sky model a bandpass is solved against.
+
+    Parameters
+    ----------
+    sources : List[dict]
+        The JSON serializable source definitions the component list is made from.
+    """
+    text = json.dumps(sources, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class BandpassCache:
+    """Bandpass tables of many nights with an index of how each was solved.
+
+    Tables are stored as root/<subband>/<YYYYMMDD>.bcal, the layout of
+    utils.get_bcal, and recorded in root/index.json with the MS they were
+    solved from, the flagged antennas and the hash of the sky model. A table
+    is only valid for a night flagging the same antennas against the same
+    model, anything else is stale and solved again.
+
+    Lookups read the index once and only check that the chosen tables still
+    exist, the table directories are never listed.
+
+    Parameters
+    ----------
+    root : Path
+        The directory of the cache. Created on the first record.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.index_path = self.root / "index.json"
+        self._lock = threading.Lock()
+
+    def path(self, subband: str, date: str) -> Path:
+        """The location of the table of a subband and night."""
+        return self.root / subband / f"{date}.bcal"
+
+    def _read(self) -> dict:
+        if not self.index_path.exists():
+            return {}
+        try:
+            with open(self.index_path) as index_file:
+                return json.load(index_file)
+        except (OSError, ValueError) as err:
+            warnings.warn(
+                f"Could not read bandpass index {self.index_path}, "
+                f"treating every table as missing: {err!r}"
+            )
+            return {}
+
+    def lookup(
+        self,
+        date: str,
+        subbands: List[str],
+        bad_ants: Union[str, Iterable],
+        source_hash: str,
+        max_days: int = 0,
+    ) -> Dict[str, Path]:
+        """Find a valid table for each subband with one read of the index.
+
+        A table of the same night is preferred, then the closest night at most
+        max_days away. Entries whose table no longer exists are removed from
+        the index.
+
+        Parameters
+        ----------
+        date : str
+            The night, as YYYYMMDD.
+        subbands : List[str]
+            The subbands to look up, e.g. "55MHz".
+        bad_ants : str | Iterable
+            The antennas flagged in the night, e.g. "3,12".
+        source_hash : str
+            The model_hash of the sky model the night would be solved against.
+        max_days : int
+            The farthest night a table may be reused from.
+
+        Returns
+        -------
+        Dict[str, Path]
+            The table of each subband which has a valid one.
+        """
+        bad_ants = normalize_bad_ants(bad_ants)
+        night = datetime.strptime(date, DATE_FORMAT)
+
+        with self._lock:
+            entries = self._read()
+
+        candidates = {}
+        for key, entry in entries.items():
+            if (
+                entry["subband"] not in subbands
+                or entry["bad_ants"] != bad_ants
+                or entry["source_hash"] != source_hash
+            ):
+                continue
+            days = abs((datetime.strptime(entry["date"], DATE_FORMAT) - night).days)
+            if days <= max_days:
+                candidates.setdefault(entry["subband"], []).append((days, key))
+
+        tables = {}
+        deleted = []
+        for subband, choices in candidates.items():
+            for _, key in sorted(choices):
+                table = self.root / entries[key]["table"]
+                if table.exists():
+                    tables[subband] = table
+                    break
+                # deleted behind the cache's back, applycal would fail on it
+                deleted.append(key)
+
+        if len(deleted) > 0:
+            with self._lock:
+                entries = self._read()
+                for key in deleted:
+                    entries.pop(key, None)
+                write_json(self.index_path, entries)
+
+        return tables
+
+    def record(
+        self,
+        date: str,
+        tables: Dict[str, Path],
+        sources: Dict[str, Path],
+        bad_ants: Union[str, Iterable],
+        source_hash: str,
+    ):
+        """Add newly solved tables of a night to the index.
+
+        Parameters
+        ----------
+        date : str
+            The night, as YYYYMMDD.
+        tables : Dict[str, Path]
+            The table of each subband, inside root.
+        sources : Dict[str, Path]
+            The MS each table was solved from.
+        bad_ants : str | Iterable
+            The antennas flagged in the solve.
+        source_hash : str
+            The model_hash of the sky model solved against.
+        """
+        bad_ants = normalize_bad_ants(bad_ants)
+        with self._lock:
+            # read again right before writing, other nights may have been added
+            entries = self._read()
+            for subband, table in tables.items():
+                entries[f"{subband}/{date}"] = {
+                    "subband": subband,
+                    "date": date,
+                    "table": str(Path(table).relative_to(self.root)),
+                    "source_ms": str(sources[subband]),
+                    "bad_ants": bad_ants,
+                    "source_hash": source_hash,
+                }
+            write_json(self.index_path, entries)
+
+    def remove(self, date: str, subbands: List[str]):
+        """Delete the tables of a night, e.g. stale ones about to be solved again."""
+        with self._lock:
+            entries = self._read()
+            for subband in subbands:
+                entries.pop(f"{subband}/{date}", None)
+                shutil.rmtree(self.path(subband, date), ignore_errors=True)
+            if self.index_path.exists():
+                write_json(self.index_path, entries)
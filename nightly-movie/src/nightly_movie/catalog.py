@@ -0,0 +1,123 @@
+# -*- mode: python; coding: utf-8 -*-
+# Copyright (c) 2024, Owens Valley Radio Observatory Long Wavelength Array
+# All rights reserved.
+
+import json
+import os
+import threading
+import warnings
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Iterable
+
+from .checkpoint import write_json
+
+if TYPE_CHECKING:
+    from astropy.coordinates import SkyCoord
+
+# ICRS positions of the A-team sources as resolved by Sesame/SIMBAD.
+# Bundled so name lookups do not need network access.
+ATEAM_POSITIONS = {
+    "Cas A": "23h23m24.0s +58d48m54s",
+    "Cyg A": "19h59m28.35663s +40d44m02.0970s",
+    "Pic A": "05h19m49.7229s -45d46m43.853s",
+    "Her A": "16h51m08.147s +04d59m33.32s",
+    "For A": "03h22m41.718s -37d12m29.62s",
+    "Cen A": "13h25m27.6152s -43d01m08.805s",
+    "Hydra A": "09h18m05.651s -12d05m43.99s",
+    "Sgr A": "17h45m40.0409s -29d00m28.118s",
+    "Pup A": "08h24m07.0s -42d59m48s",
+    "Tau A": "05h34m31.94s +22d00m52.2s",
+    "Vir A": "12h30m49.42338s +12d23m28.0439s",
+}
+
+# resolved coordinates of any other sources are stored here
+SOURCE_CACHE_PATH = os.environ.get(
+    "NIGHTLY_MOVIE_SOURCE_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "nightly_movie", "sources.json"),
+)
+
+_COORDS = {}
+_COORDS_LOCK = threading.Lock()
+
+
+def _read_cache(cache_path: str) -> dict:
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path) as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError) as err:
+        warnings.warn(
+            f"Could not read source cache {cache_path}, "
+            f"resolving every source again: {err!r}"
+        )
+        return {}
+
+
+def get_source_coord(name: str, cache_path: str = None) -> "SkyCoord":
+    """Get the ICRS coordinate of a named source.
+
+    Sources are looked up in the bundled A-team positions, then the on-disk
+    cache. Only unknown sources are resolved with SkyCoord.from_name, and the
+    result is added to the on-disk cache.
+
+    Parameters
+    ----------
+    name : str
+        The name of the source, e.g. "Cas A"
+    cache_path : str
+        JSON file of previously resolved positions.
+        Defaults to SOURCE_CACHE_PATH.
+
+    Returns
+    -------
+    SkyCoord
+        The position of the source.
+    """
+    from astropy.coordinates import SkyCoord
+
+    with _COORDS_LOCK:
+        if name in _COORDS:
+            return _COORDS[name]
+
+        if name in ATEAM_POSITIONS:
+            coord = SkyCoord(ATEAM_POSITIONS[name], frame="icrs")
+        else:
+            cache_path = cache_path or SOURCE_CACHE_PATH
+            positions = _read_cache(cache_path)
+            if name in positions:
+                coord = SkyCoord(*positions[name], unit="deg", frame="icrs")
+            else:
+                coord = SkyCoord.from_name(name).icrs
+                positions[name] = [coord.ra.deg, coord.dec.deg]
+                write_json(cache_path, positions)
+
+        _COORDS[name] = coord
+        return coord
+
+
+class SourceCatalog(Mapping):
+    """A read-only mapping of source names to coordinates, resolved on first access.
+
+    Parameters
+    ----------
+    names : Iterable[str]
+        The names of the sources in this catalog.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names = list(names)
+
+    def __getitem__(self, name: str) -> "SkyCoord":
+        if name not in self.names:
+            raise KeyError(name)
+        return get_source_coord(name)
+
+    def __contains__(self, name) -> bool:
+        return name in self.names
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
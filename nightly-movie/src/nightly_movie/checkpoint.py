@@ -0,0 +1,101 @@
+# -*- mode: python; coding: utf-8 -*-
+# Copyright (c) 2024, Owens Valley Radio Observatory Long Wavelength Array
+# All rights reserved.
+
+import json
+import os
+import tempfile
+import threading
+import warnings
+from pathlib import Path
+from typing import Any, List
+
+
+class Manifest:
+    """A persistent record of the stages each item of a run has completed.
+
+    Every call to mark rewrites the JSON file, so the record survives the
+    process being killed at any point. Items are identified by a string key,
+    e.g. the timestamp of a window.
+
+    Parameters
+    ----------
+    path : Path
+        The JSON file. Read if it exists, otherwise created on the first mark.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._items = {}
+
+        if self.path.exists():
+            try:
+                with open(self.path) as manifest_file:
+                    self._items = json.load(manifest_file)
+            except (OSError, ValueError) as err:
+                warnings.warn(
+                    f"Could not read manifest {self.path}, starting over: {err!r}"
+                )
+
+    def completed(self, key: str) -> List[str]:
+        """The stages completed for an item, in the order they were marked."""
+        with self._lock:
+            return list(self._items.get(key, {}).get("completed", []))
+
+    def get(self, key: str, field: str, default: Any = None) -> Any:
+        """A field stored with mark for an item."""
+        with self._lock:
+            return self._items.get(key, {}).get(field, default)
+
+    def mark(self, key: str, stage: str, **fields):
+        """Record that an item completed a stage.
+
+        Parameters
+        ----------
+        key : str
+            The item.
+        stage : str
+            The stage completed.
+        fields
+            JSON serializable values to store with the item, e.g. output names.
+        """
+        with self._lock:
+            item = self._items.setdefault(key, {"completed": []})
+            if stage not in item["completed"]:
+                item["completed"].append(stage)
+            item.update(fields)
+            self._write()
+
+    def clear(self, key: str = None):
+        """Forget one item, or every item if key is None."""
+        with self._lock:
+            if key is None:
+                self._items.clear()
+            else:
+                self._items.pop(key, None)
+            self._write()
+
+    def remove(self):
+        """Forget every item and delete the file."""
+        with self._lock:
+            self._items.clear()
+            if self.path.exists():
+                self.path.unlink()
+
+    def _write(self):
+        write_json(self.path, self._items)
+
+
+def write_json(path: Path, data: Any):
+    """Write a JSON file atomically, so a crash never leaves half a file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmpname = tempfile.mkstemp(dir=path.parent, suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as tmpfile:
+            json.dump(data, tmpfile, indent=1, sort_keys=True)
+        os.replace(tmpname, path)
+    except BaseException:
+        os.unlink(tmpname)
+        raise
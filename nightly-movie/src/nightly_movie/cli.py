@@ -1,22 +1,30 @@
-import matplotlib  # noqa:
-
-matplotlib.use("Agg")  # noqa:
-
 import argparse
 import re
-import shutil
-import subprocess
+import signal
 import sys
+import threading
+from concurrent.futures import Executor
+from contextlib import ExitStack
 from functools import partial
-from multiprocessing import Pool
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Union
 
-import ffmpeg
 from astropy import units
-from astropy.time import TimeDelta
-from casatasks import applycal, clearcal
+from astropy.time import Time, TimeDelta
 
 from . import utils
+from .calcache import BandpassCache
+from .checkpoint import Manifest
+from .ephemeris import BodyEphemeris
+from .filecatalog import MSCatalog
+from .imaging import WSCleanJob, node_resources, run_wsclean_jobs
+from .movie import MovieWriter, concat_movies
+from .pipeline import Pipeline, Stage
+from .staging import STRATEGIES, ScratchArea, WorkingDirectory
+from .workers import casa_pool, map_files, render_pool
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 class DefaultRaw(
@@ -26,15 +34,219 @@ class DefaultRaw(
     pass
 
 
+BANDS = ["highband", "lowband"]
+# the progress of a window recorded in the manifest, in pipeline order
+STATES = ["copied", "calibrated", "imaged", "plotted"]
 DATE_REGEX = re.compile(r"^\d{4}-\d{2}-\d{2}$")
 COMPONENT_LIST = str(Path("/lustre/mkolopanis/movies") / "ovro_ateam.cl")
 
-WSCLEAN_CMD = (
-    "OPENBLAS_NUM_THREADS=1 /opt/bin/wsclean -j 16 -mem 30 -multiscale "
-    "-multiscale-scale-bias 0.8 -pol IV -size 4096 4096 -scale 0.03125 "
-    "-niter 0 -casa-mask /home/pipeline/cleanmask.mask/ -mgain 0.85 "
-    "-weight briggs 0 -name "
-)
+
+class Window:
+    """The files and output names of one time window of the night.
+
+    Parameters
+    ----------
+    central_time : Time
+        The central time of the window.
+    files : List[Path]
+        The data files of the integration imaged for this window.
+    date_dir : Path
+        The directory images and plots are written to.
+    """
+
+    def __init__(self, central_time: Time, files: List[Path], date_dir: Path):
+        self.central_time = central_time
+        self.files = files
+        # output time in YYYYMMDD_HHMMSS
+        self.time_str = central_time.strftime("%Y%m%d_%H%M%S")
+
+        # copies of the files being calibrated and imaged
+        self.working_files = []
+        # states reached in an earlier run whose outputs still exist
+        self.completed = []
+
+        self.images = {
+            band: str(date_dir / f"{self.time_str}_{band}") for band in BANDS
+        }
+        # position of the window in the movie parts of this run
+        self.frame_index = None
+        # the movie part holding the frame of each band once it is finished
+        self.parts = {}
+
+    def __str__(self):
+        return self.central_time.iso
+
+    def band_files(self) -> dict:
+        """Split the working files into high and low bands."""
+        lowband, highband = utils.partition_files(self.working_files)
+        return {"highband": highband, "lowband": lowband}
+
+    def fits_files(self, band: str) -> List[str]:
+        """The Stokes I and V images of a band."""
+        return [self.images[band] + f"-{pol}-dirty.fits" for pol in ["I", "V"]]
+
+    def outputs_exist(self, state: str) -> bool:
+        """Check whether the outputs of a state are all on disk."""
+        if state == "plotted":
+            outputs = [self.parts[band] for band in BANDS if band in self.parts]
+            if len(outputs) < len(BANDS):
+                return False
+        elif state == "imaged":
+            outputs = [fname for band in BANDS for fname in self.fits_files(band)]
+        else:
+            outputs = self.working_files
+
+        return len(outputs) > 0 and all(Path(fname).exists() for fname in outputs)
+
+    def remove_images(self):
+        """Delete the images once the frames are in a finished movie part."""
+        for band in BANDS:
+            for fits_file in self.fits_files(band):
+                Path(fits_file).unlink()
+
+    def resume(self, manifest: Manifest, working_dir: Path):
+        """Restore the progress of this window recorded in a manifest.
+
+        The window resumes after the latest recorded state whose outputs are
+        still on disk. Working copies are only reused if they are in
+        working_dir, copies left in another run's scratch area are not.
+
+        Parameters
+        ----------
+        manifest : Manifest
+            The manifest of the night.
+        working_dir : Path
+            The directory working copies are staged in by this run.
+        """
+        recorded = manifest.completed(self.time_str)
+        self.parts = manifest.get(self.time_str, "parts", {})
+        self.working_files = [
+            Path(fname)
+            for fname in manifest.get(self.time_str, "working_files", [])
+            if Path(fname).parent == Path(working_dir)
+        ]
+
+        self.completed = []
+        for ind in reversed(range(len(STATES))):
+            if STATES[ind] in recorded and self.outputs_exist(STATES[ind]):
+                self.completed = STATES[: ind + 1]
+                break
+
+        # working copies are released once imaged
+        if len(self.completed) == 0 or self.completed[-1] not in STATES[:2]:
+            self.working_files = []
+
+
+class MovieParts:
+    """The movie parts of a run, a new one every part_frames windows.
+
+    A part is closed as soon as the frames of all its windows are encoded,
+    then its windows are recorded as plotted and their images deleted. A
+    frame sent to ffmpeg is recorded as encoded, but its images are kept
+    until the part is closed: a part cut short by a kill is unusable, and its
+    windows are plotted again from the images by the next run.
+
+    Parameters
+    ----------
+    manifest : Manifest
+        The manifest of the night.
+    windows : List[Window]
+        The windows plotted by this run, in the order of the movie.
+    date_dir : Path
+        The directory the parts are written to.
+    part_frames : int
+        The number of windows in each part.
+    """
+
+    def __init__(
+        self,
+        manifest: Manifest,
+        windows: List[Window],
+        date_dir: Path,
+        part_frames: int,
+    ):
+        self.manifest = manifest
+        self.windows = windows
+        self.date_dir = Path(date_dir)
+        self.part_frames = part_frames
+        for index, window in enumerate(windows):
+            window.frame_index = index
+
+        self._lock = threading.Lock()
+        # part number -> MovieWriter of each band, while the part is open
+        self._writers = {}
+        self._finished = set()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _part_windows(self, number: int) -> List[Window]:
+        start = number * self.part_frames
+        return self.windows[start : start + self.part_frames]
+
+    def write(self, window: Window, band: str, frame: "np.ndarray"):
+        """Add the frame of a band of a window, closing its part once complete."""
+        number, index = divmod(window.frame_index, self.part_frames)
+        with self._lock:
+            # a new writer would overwrite the finished part
+            if self._closed or number in self._finished:
+                raise ValueError(f"The movie part of window {window} is closed.")
+            if number not in self._writers:
+                first = self._part_windows(number)[0]
+                self._writers[number] = {}
+                for name in BANDS:
+                    part = self.date_dir / f"ovro_nightly_{name}_{first.time_str}.ts"
+                    self._writers[number][name] = MovieWriter(
+                        part, on_encoded=partial(self._record_frame, name, part)
+                    )
+            writers = self._writers[number]
+
+        writers[band].write(index, frame, key=window.time_str)
+
+        nframes = len(self._part_windows(number))
+        with self._lock:
+            complete = number in self._writers and all(
+                len(writer.written) == nframes for writer in writers.values()
+            )
+            if complete:
+                del self._writers[number]
+                self._finished.add(number)
+        if complete:
+            self._finish(writers)
+
+    def _record_frame(self, band: str, part: Path, key: str, index: int):
+        with self._lock:
+            frames = self.manifest.get(key, "frames", {})
+            frames[band] = [str(part), index]
+            self.manifest.mark(key, "encoded", frames=frames)
+
+    def _finish(self, writers: dict):
+        written = [set(writer.close()) for writer in writers.values()]
+        parts = {band: str(writer.outname) for band, writer in writers.items()}
+
+        for window in self.windows:
+            if all(window.time_str in keys for keys in written):
+                window.parts = parts
+                self.manifest.mark(window.time_str, "plotted", parts=parts)
+                window.remove_images()
+
+    def close(self):
+        """Close the open parts, keeping the windows encoded so far.
+
+        Frames after a window which never arrived are dropped, and plotted
+        again by the next run.
+        """
+        with self._lock:
+            self._closed = True
+            writers = list(self._writers.values())
+            self._writers.clear()
+
+        for part_writers in writers:
+            self._finish(part_writers)
 
 
 def main():
@@ -74,6 +286,201 @@ def main():
         default=Path("/lustre/pipeline/slow"),
     )
 
+    parser.add_argument(
+        "--catalog",
+        required=False,
+        type=Path,
+        default=Path("/lustre/mkolopanis/movies") / "ms_catalog.sqlite",
+        help=(
+            "SQLite catalog of observed MS files. "
+            "Only hour directories which changed since the last run are listed."
+        ),
+    )
+
+    parser.add_argument(
+        "--rescan",
+        action="store_true",
+        help="List every hour directory of the date when updating the catalog.",
+    )
+
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help=(
+            "Ignore the progress recorded by an earlier run of the same date "
+            "and process every window again."
+        ),
+    )
+
+    parser.add_argument(
+        "--max-windows",
+        required=False,
+        type=int,
+        default=3,
+        help=(
+            "The number of time windows processed at once. "
+            "e.g. 3 copies window N+1 while imaging window N and plotting window N-1."
+        ),
+    )
+
+    parser.add_argument(
+        "--part-frames",
+        required=False,
+        type=int,
+        default=20,
+        help=(
+            "The number of windows in each movie part. The images of a window "
+            "are kept until its part is finished, about 256 MB per window."
+        ),
+    )
+
+    parser.add_argument(
+        "--copy-workers",
+        required=False,
+        type=int,
+        default=1,
+        help="The number of windows copied at once.",
+    )
+
+    parser.add_argument(
+        "--copy-strategy",
+        required=False,
+        type=str,
+        choices=STRATEGIES,
+        default="auto",
+        help=(
+            "How working copies of the data are made. "
+            "auto uses copy-on-write clones when the filesystem supports them, "
+            "otherwise an uncompressed copy."
+        ),
+    )
+
+    parser.add_argument(
+        "--copy-threads",
+        required=False,
+        type=int,
+        default=4,
+        help="The number of files copied at once within a window.",
+    )
+
+    parser.add_argument(
+        "--scratch",
+        required=False,
+        type=Path,
+        default=None,
+        help=(
+            "Node-local scratch directory (e.g. NVMe or /dev/shm) for working copies "
+            "of the data. By default working copies are written next to the output."
+        ),
+    )
+
+    parser.add_argument(
+        "--scratch-budget",
+        required=False,
+        type=float,
+        default=100.0,
+        help=(
+            "Maximum GB of working copies kept in --scratch. "
+            "Copies of the next windows wait until space is freed."
+        ),
+    )
+
+    parser.add_argument(
+        "--bcal-cache",
+        required=False,
+        type=Path,
+        default=Path("/lustre/mkolopanis/movies/bcal"),
+        help=(
+            "Directory of naive bandpass tables shared by all nights, "
+            "with an index of the antennas flagged and sky model of each."
+        ),
+    )
+
+    parser.add_argument(
+        "--bcal-max-days",
+        required=False,
+        type=int,
+        default=0,
+        help=(
+            "Reuse a cached naive bandpass table from up to this many nights away "
+            "if it flagged the same antennas. By default only tables of the same "
+            "night are reused."
+        ),
+    )
+
+    parser.add_argument(
+        "--cal-workers",
+        required=False,
+        type=int,
+        default=1,
+        help=(
+            "The number of processes used to calibrate the subbands of a window, "
+            "and to solve the subbands of the naive calibration. "
+            "1 runs calibration in the main process."
+        ),
+    )
+
+    parser.add_argument(
+        "--image-workers",
+        required=False,
+        type=int,
+        default=1,
+        help="The number of windows imaged at once.",
+    )
+
+    parser.add_argument(
+        "--wsclean-cores",
+        required=False,
+        type=int,
+        default=None,
+        help=(
+            "Cores shared by all wsclean runs. Defaults to every core available. "
+            "Split evenly between the bands and windows imaged at once."
+        ),
+    )
+
+    parser.add_argument(
+        "--wsclean-mem",
+        required=False,
+        type=float,
+        default=60.0,
+        help=(
+            "Percentage of node memory shared by all wsclean runs. "
+            "Split evenly between the bands and windows imaged at once."
+        ),
+    )
+
+    parser.add_argument(
+        "--plot-workers",
+        required=False,
+        type=int,
+        default=1,
+        help="The number of windows plotted at once.",
+    )
+
+    parser.add_argument(
+        "--render-workers",
+        required=False,
+        type=int,
+        default=2,
+        help=(
+            "The number of processes rendering frames. "
+            "They are started once and shared by all windows being plotted."
+        ),
+    )
+
+    parser.add_argument(
+        "--plot-downsample",
+        required=False,
+        type=int,
+        default=1,
+        help=(
+            "Average the images in blocks of N x N pixels before plotting. "
+            "Frames are about 500 pixels across per image, so 4 keeps the detail "
+            "of 4096 pixel images and renders several times faster."
+        ),
+    )
+
     args = parser.parse_args()
 
     # group all files
@@ -81,18 +488,20 @@ def main():
     if DATE_REGEX.match(args.date) is None:
         raise ValueError("Input date must be a date in the format YYYY-MM-DD")
 
-    filelist = list(args.datapath.glob(f"*[!13MHz]*/{args.date}/*/*MHz.ms"))
+    with MSCatalog(args.catalog) as catalog:
+        catalog.update(args.datapath, args.date, rescan=args.rescan)
+        filelist = catalog.files(args.datapath, args.date, exclude_subbands=["13MHz"])
 
     subbands = list(
         set(map(lambda x: utils.TIME_REGEX.match(str(x)).group("band"), filelist))
     )
 
     bcal_exists = utils.check_for_bcal(args.date, subbands)
-    calibration_function = partial(apply_cal, bcal_exists)
 
     print("Grouping data files")
     # switch to a central time in a 5min window. Don't use the entire window.
-    grouped_data = utils.group_files(filelist, TimeDelta(args.interval * units.min))
+    file_index = utils.FileIndex(filelist)
+    grouped_data = file_index.group(TimeDelta(args.interval * units.min))
 
     # TODO: General bleach the absolute paths somehow
     date_dir = Path("/lustre/mkolopanis/movies") / args.date
@@ -101,98 +510,261 @@ def main():
     # make the date's directory in the staging area.
     output_prefix.mkdir(parents=True, exist_ok=True)
 
-    if not bcal_exists:
-        print("No bcal files found. generating naive calibration")
-        utils.naive_calibration(grouped_data, output_prefix)
+    # progress of every window, so a rerun after a crash picks up where it stopped
+    manifest = Manifest(date_dir / "manifest.json")
+    if args.restart:
+        manifest.clear()
+
+    windows = [
+        Window(central_time, file_index.central_integration(central_time), date_dir)
+        for central_time in grouped_data
+    ]
+
+    # SLURM sends SIGTERM at the time limit, exit through the ExitStack so the
+    # movie parts encoded so far are finished and recorded
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    # pools, working copies and movie parts are closed even if a step fails
+    with ExitStack() as stack:
+        # CASA is not thread safe so subbands are calibrated in worker processes
+        cal_pool = None
+        if args.cal_workers > 1:
+            cal_pool = stack.enter_context(casa_pool(args.cal_workers))
+
+        if bcal_exists:
+            celery_bcal = Path("/lustre/celery/bcal/")
+            date_name = args.date.replace("-", "") + ".bcal"
+            bcal_tables = {band: celery_bcal / band / date_name for band in subbands}
+        else:
+            print("No bcal files found. generating naive calibration")
+            bcal_tables = utils.naive_calibration(
+                grouped_data,
+                output_prefix,
+                file_index=file_index,
+                executor=cal_pool,
+                cache=BandpassCache(args.bcal_cache),
+                max_days=args.bcal_max_days,
+            )
 
-    for central_time, file_group in grouped_data.items():
-        print(f"Working on {central_time.iso}")
-        file_group = utils.get_central_integration(file_group, central_time)
-        print("\tCopying Files")
-        working_file_group = utils.copy_files(file_group, output_prefix)
-        # Split into high and low bands
-        lowband, highband = utils.partition_files(working_file_group)
+        # split the node between the windows imaged at once
+        node_cores, node_memory = node_resources()
+        image_cores = (args.wsclean_cores or node_cores) // args.image_workers
+        image_memory = node_memory * args.wsclean_mem / 100 / args.image_workers
+
+        # frames render in the background while the next windows are imaged
+        frame_pool = stack.enter_context(render_pool(args.render_workers))
+
+        # working copies go to node-local scratch if given
+        if args.scratch is not None:
+            stager = ScratchArea(
+                args.scratch,
+                int(args.scratch_budget * 1024**3),
+                strategy=args.copy_strategy,
+                workers=args.copy_threads,
+            )
+        else:
+            stager = WorkingDirectory(
+                output_prefix, strategy=args.copy_strategy, workers=args.copy_threads
+            )
+        stack.enter_context(stager)
+
+        for window in windows:
+            window.resume(manifest, stager.path)
+        remaining = [window for window in windows if "plotted" not in window.completed]
+        if len(remaining) < len(windows):
+            print(
+                f"Resuming: {len(windows) - len(remaining)} of {len(windows)} "
+                "windows were completed by an earlier run"
+            )
 
-        # output time in YYYYMMDD_HHMMSS
-        time_str = central_time.strftime("%Y%m%d_%H%M%S")
+        # movie parts not in the manifest were cut short by a kill, the
+        # windows encoded into them are plotted again from their images
+        kept_parts = {part for window in windows for part in window.parts.values()}
+        for part in date_dir.glob("ovro_nightly_*.ts"):
+            if str(part) not in kept_parts:
+                part.unlink()
+        lost = [
+            window
+            for window in remaining
+            if "encoded" in manifest.completed(window.time_str)
+        ]
+        if len(lost) > 0:
+            print(f"Plotting {len(lost)} windows of unfinished movie parts again")
+
+        # frames are encoded as soon as they are rendered, closed on failure
+        # too so the windows already encoded are kept
+        movie_parts = stack.enter_context(
+            MovieParts(manifest, remaining, date_dir, args.part_frames)
+        )
+
+        # positions of the bodies marked on the frames, for the whole night at once
+        ephemeris = BodyEphemeris(Time([window.central_time for window in windows]))
+
+        def checkpointed(state, function):
+            return partial(run_checkpointed, manifest, state, function)
+
+        pipeline = Pipeline(
+            [
+                Stage(
+                    "copy",
+                    checkpointed("copied", partial(copy_window, stager)),
+                    args.copy_workers,
+                ),
+                Stage(
+                    "calibrate",
+                    checkpointed(
+                        "calibrated",
+                        partial(calibrate_window, stager, bcal_tables, cal_pool),
+                    ),
+                ),
+                Stage(
+                    "image",
+                    checkpointed(
+                        "imaged",
+                        partial(image_window, stager, image_cores, image_memory),
+                    ),
+                    args.image_workers,
+                ),
+                Stage(
+                    "plot",
+                    partial(
+                        plot_window,
+                        movie_parts,
+                        frame_pool,
+                        ephemeris,
+                        args.plot_downsample,
+                    ),
+                    args.plot_workers,
+                ),
+            ],
+            max_in_flight=args.max_windows,
+            # windows waiting for scratch space would wait for the failed one
+            on_failure=stager.cancel,
+        )
+        pipeline.run(remaining)
+
+    print("Joining movie parts")
+    date_str = "".join(args.date.split("-"))
+    for band in BANDS:
+        parts = list(dict.fromkeys(window.parts[band] for window in windows))
+        concat_movies(
+            parts,
+            Path("/lustre/mkolopanis/movies") / f"ovro_nightly_{band}_{date_str}.mp4",
+        )
+        for part in parts:
+            Path(part).unlink()
 
-        highband_name_stem = f"{time_str}_highband"
-        lowband_name_stem = f"{time_str}_lowband"
+    # the night is done, a rerun should start from scratch
+    manifest.remove()
 
-        highband_image = str(date_dir / highband_name_stem)
-        lowband_image = str(date_dir / lowband_name_stem)
 
-        highband_jpg = str(date_dir / (highband_name_stem + ".jpg"))
-        lowband_jpg = str(date_dir / (lowband_name_stem + ".jpg"))
+def run_checkpointed(
+    manifest: Manifest, state: str, function: Callable, window: Window
+) -> Window:
+    """Run a stage on a window unless an earlier run completed it.
 
-        for filename in lowband + highband:
-            calibration_function(filename)
+    The state is recorded in the manifest once the stage finishes.
+    """
+    if state in window.completed:
+        return window
 
-        subprocess.run(
-            WSCLEAN_CMD + f"{highband_image} {' '.join(map(str, highband))}",
-            shell=True,
-            check=True,
+    window = function(window)
+    manifest.mark(
+        window.time_str,
+        state,
+        working_files=[str(fname) for fname in window.working_files],
+    )
+    return window
+
+
+def copy_window(stager: Union[WorkingDirectory, ScratchArea], window: Window) -> Window:
+    window.working_files = stager.stage(window.files)
+    return window
+
+
+def calibrate_window(
+    stager: Union[WorkingDirectory, ScratchArea],
+    bcal_tables: Dict[str, Path],
+    cal_pool: Union[Executor, None],
+    window: Window,
+) -> Window:
+    try:
+        map_files(
+            partial(apply_cal, bcal_tables),
+            window.working_files,
+            executor=cal_pool,
+            verbose=False,
+        )
+    except BaseException:
+        # the copies are never imaged, free their space for the other windows
+        release_working_files(stager, window)
+        raise
+    return window
+
+
+def image_window(
+    stager: Union[WorkingDirectory, ScratchArea],
+    cores: int,
+    memory: float,
+    window: Window,
+) -> Window:
+    # both bands are imaged at the same time, sharing cores and memory
+    try:
+        run_wsclean_jobs(
+            [
+                WSCleanJob(window.images[band], files)
+                for band, files in window.band_files().items()
+            ],
+            cores=cores,
+            memory=memory,
         )
-        subprocess.run(
-            WSCLEAN_CMD + f"{lowband_image} {' '.join(map(str, lowband))}",
-            shell=True,
-            check=True,
+    finally:
+        # the images are all that is needed from here on, and on failure the
+        # copies would otherwise hold scratch space for the rest of the run
+        release_working_files(stager, window)
+
+    return window
+
+
+def release_working_files(stager: Union[WorkingDirectory, ScratchArea], window: Window):
+    stager.release(window.working_files)
+    window.working_files = []
+
+
+def plot_window(
+    movie_parts: MovieParts,
+    frame_pool: Executor,
+    ephemeris: BodyEphemeris,
+    downsample: int,
+    window: Window,
+) -> Window:
+    # both bands render at once in the run's long-lived pool
+    futures = [
+        frame_pool.submit(
+            utils.render_snapshot,
+            window.fits_files(band),
+            band == "highband",
+            downsample,
+            ephemeris,
         )
+        for band in BANDS
+    ]
+    frames = [future.result() for future in futures]
 
-        with Pool(2) as p:
-            p.starmap(
-                utils.plot_snapshot,
-                [
-                    (
-                        [
-                            highband_image + "-I-dirty.fits",
-                            highband_image + "-V-dirty.fits",
-                        ],
-                        highband_jpg,
-                    ),
-                    (
-                        [
-                            lowband_image + "-I-dirty.fits",
-                            lowband_image + "-V-dirty.fits",
-                        ],
-                        lowband_jpg,
-                    ),
-                ],
-            )
-        print("Removing data files")
-        for path in lowband + highband:
-            shutil.rmtree(path)
+    # the images are deleted once the part holding the frames is finished
+    for band, frame in zip(BANDS, frames):
+        movie_parts.write(window, band, frame)
 
-        for image_type in [highband_image, lowband_image]:
-            for pol in ["I", "V"]:
-                Path(image_type + "-" + pol + "-dirty.fits").unlink()
+    return window
+
+
+def apply_cal(bcal_tables: Dict[str, Path], filename: Path):
+    from casatasks import applycal, clearcal
 
-    date_str = "".join(args.date.split("-"))
-    for name in ["highband", "lowband"]:
-        ffmpeg.input(
-            f"{date_dir}/*{name}.jpg",
-            pattern_type="glob",
-            framerate=12.5,
-        ).output(
-            str(
-                Path("/lustre/mkolopanis/movies")
-                / f"ovro_nightly_{name}_{date_str}.mp4"
-            ),
-        ).overwrite_output().run(cmd=str(Path(sys.executable).parent / "ffmpeg"))
-
-    print("Removing intermediate JPG files")
-    for jpg_file in Path(f"{date_dir}").glob("*.jpg"):
-        jpg_file.unlink()
-
-
-def apply_cal(bcal_exists: bool, filename: Path):
     filename = str(filename)
 
     clearcal(filename, addmodel=True)
 
-    if bcal_exists:
-        bcal = utils.get_bcal(filename, Path("/lustre/celery/bcal/"))
-    else:
-        bcal = utils.get_bcal(filename, Path(filename).parent)
+    bcal = bcal_tables[utils.TIME_REGEX.match(filename).group("band")]
 
-    applycal(filename, gaintable=[bcal], flagbackup=False)
+    applycal(filename, gaintable=[str(bcal)], flagbackup=False)
@@ -0,0 +1,146 @@
+# -*- mode: python; coding: utf-8 -*-
+# Copyright (c) 2024, Owens Valley Radio Observatory Long Wavelength Array
+# All rights reserved.
+
+from typing import TYPE_CHECKING, Iterable, List
+
+import numpy as np
+from astropy import units
+from astropy.time import Time
+
+if TYPE_CHECKING:
+    from astropy.coordinates import SkyCoord
+
+# solar system bodies marked on every frame
+BODIES = ["Sun", "Moon", "Jupiter"]
+
+
+class BodyEphemeris:
+    """Alt/az positions of solar system bodies over a night.
+
+    The ephemeris of every body is evaluated and transformed to alt/az for
+    all times at once, one vectorized call per body. Positions at other times are
+    interpolated between the nearest two, which is far below a pixel for
+    times a few minutes apart.
+
+    Distances are dropped: WSClean writes its images in FK5, which is
+    barycentric, so bodies are placed by their apparent alt/az only.
+
+    Parameters
+    ----------
+    times : Time
+        The times to evaluate the ephemeris at, e.g. the window central times.
+    bodies : List[str]
+        Names of the bodies understood by astropy's get_body.
+    """
+
+    def __init__(self, times: Time, bodies: List[str] = BODIES):
+        from astropy.coordinates import AltAz, get_body
+
+        from .beam import OVRO_LOCATION
+
+        self.bodies = list(bodies)
+        self.mjd = np.unique(np.atleast_1d(Time(times).utc.mjd))
+        times = Time(self.mjd, format="mjd", scale="utc")
+
+        ovro_altaz = AltAz(obstime=times, location=OVRO_LOCATION)
+        coords = [
+            get_body(body, times, location=OVRO_LOCATION).transform_to(ovro_altaz)
+            for body in self.bodies
+        ]
+
+        # unit vectors, shape (bodies, times, 3), interpolate without wrapping az
+        alt = np.stack([coord.alt.rad for coord in coords])
+        az = np.stack([coord.az.rad for coord in coords])
+        self._xyz = np.stack(
+            [np.cos(alt) * np.cos(az), np.cos(alt) * np.sin(az), np.sin(alt)], axis=-1
+        )
+
+    def altaz(self, time: Time) -> "SkyCoord":
+        """The alt/az of every body at a time.
+
+        Parameters
+        ----------
+        time : Time
+            A single time. Times outside of the evaluated range are extrapolated.
+
+        Returns
+        -------
+        SkyCoord
+            The positions of the bodies, in the order of bodies.
+        """
+        from astropy.coordinates import AltAz, SkyCoord
+
+        from .beam import OVRO_LOCATION
+
+        if len(self.mjd) == 1:
+            xyz = self._xyz[:, 0]
+        else:
+            mjd = time.utc.mjd
+            ind = np.clip(np.searchsorted(self.mjd, mjd), 1, len(self.mjd) - 1)
+            frac = (mjd - self.mjd[ind - 1]) / (self.mjd[ind] - self.mjd[ind - 1])
+            xyz = (1 - frac) * self._xyz[:, ind - 1] + frac * self._xyz[:, ind]
+
+        return SkyCoord(
+            alt=np.arctan2(xyz[:, 2], np.hypot(xyz[:, 0], xyz[:, 1])) * units.rad,
+            az=np.arctan2(xyz[:, 1], xyz[:, 0]) * units.rad,
+            frame=AltAz(obstime=time, location=OVRO_LOCATION),
+        )
+
+
+class SourceVisibility:
+    """Alt/az of many fixed sources at many times, computed as one array.
+
+    Parameters
+    ----------
+    times : Time
+        The times, e.g. the window central times of a night.
+    sources : Iterable[str]
+        Source names understood by catalog.get_source_coord.
+        Defaults to the A-team sources.
+    """
+
+    def __init__(self, times: Time, sources: Iterable[str] = None):
+        from astropy.coordinates import AltAz, SkyCoord
+
+        from .beam import OVRO_LOCATION
+        from .catalog import ATEAM_POSITIONS, get_source_coord
+
+        self.sources = list(ATEAM_POSITIONS if sources is None else sources)
+        self.times = Time(times).reshape(-1)
+
+        coords = SkyCoord([get_source_coord(name) for name in self.sources])
+        # broadcast sources along the first axis and times along the second
+        altaz = coords[:, np.newaxis].transform_to(
+            AltAz(obstime=self.times[np.newaxis], location=OVRO_LOCATION)
+        )
+        # degrees, shape (sources, times)
+        self.alt = altaz.alt.deg
+        self.az = altaz.az.deg
+
+    def _source_index(self, source: str) -> int:
+        try:
+            return self.sources.index(source)
+        except ValueError:
+            raise KeyError(f"{source} is not one of the sources {self.sources}")
+
+    def altaz(self, source: str) -> tuple:
+        """The azimuth and altitude of a source at every time, in degrees."""
+        ind = self._source_index(source)
+        return self.az[ind], self.alt[ind]
+
+    def max_elevation_index(self, source: str) -> int:
+        """The index of the time a source is highest."""
+        return int(np.argmax(self.alt[self._source_index(source)]))
+
+    def time_of_max_elevation(self, source: str) -> Time:
+        """The time a source is highest."""
+        return self.times[self.max_elevation_index(source)]
+
+    def above_horizon(self, time_index: int, min_alt: float = 0.0) -> List[str]:
+        """The sources higher than min_alt degrees at a time."""
+        return [
+            source
+            for source, alt in zip(self.sources, self.alt[:, time_index])
+            if alt >= min_alt
+        ]
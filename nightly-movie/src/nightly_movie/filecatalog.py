@@ -0,0 +1,253 @@
+# -*- mode: python; coding: utf-8 -*-
+# Copyright (c) 2024, Owens Valley Radio Observatory Long Wavelength Array
+# All rights reserved.
+
+import argparse
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Iterable, List
+
+DATE_DIR_REGEX = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+MS_REGEX = re.compile(r"^(?P<time>\d{8}_\d{6})_(?P<band>\d{2}MHz)\.ms$")
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    datapath TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    subband TEXT NOT NULL,
+    hour_dir TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_by_date ON files (datapath, date, time);
+CREATE INDEX IF NOT EXISTS files_by_hour ON files (hour_dir);
+CREATE TABLE IF NOT EXISTS scanned (
+    hour_dir TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+"""
+
+
+class MSCatalog:
+    """A persistent SQLite catalog of the observed MS files.
+
+    Files are keyed by data path, date, time and subband. The catalog is
+    updated incrementally: an hour directory is only listed again if its
+    modification time changed since it was last scanned, so repeated runs
+    over the same night only cost one stat per hour directory.
+
+    Data are expected to be laid out as <datapath>/<band>/<date>/<hour>/*.ms,
+    or as <datapath>/<band>/<date>/*.ms
+
+    Parameters
+    ----------
+    path : Path
+        The SQLite database file. Created if it does not exist.
+    readonly : bool
+        Only query an existing catalog, e.g. from many batch jobs at once.
+    """
+
+    def __init__(self, path: Path, readonly: bool = False):
+        self.path = Path(path)
+        if readonly:
+            # raises sqlite3.OperationalError if the catalog does not exist
+            self.connection = sqlite3.connect(
+                f"{self.path.absolute().as_uri()}?mode=ro", uri=True, timeout=60
+            )
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path), timeout=60)
+        with self.connection:
+            self.connection.executescript(CATALOG_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def update(self, datapath: Path, date: str, rescan: bool = False) -> int:
+        """Add any new files for a date to the catalog.
+
+        Parameters
+        ----------
+        datapath : Path
+            The root data directory containing one directory per subband.
+        date : str
+            The date directory to scan, formatted YYYY-MM-DD.
+        rescan : bool
+            List every hour directory even if it has not changed.
+
+        Returns
+        -------
+        int
+            The number of date and hour directories listed.
+        """
+        datapath = _normalize(datapath)
+        scanned = dict(
+            self.connection.execute("SELECT hour_dir, mtime_ns FROM scanned")
+        )
+
+        nscanned = 0
+        found = set()
+        for band_dir in _subdirs(datapath):
+            date_dir = Path(band_dir) / date
+            if not date_dir.is_dir():
+                continue
+
+            # the date directory itself holds the files in the older layout
+            hour_dirs = [
+                path
+                for path in _subdirs(date_dir)
+                if MS_REGEX.match(os.path.basename(path)) is None
+            ]
+            for hour_dir in [str(date_dir), *hour_dirs]:
+                found.add(hour_dir)
+                mtime_ns = os.stat(hour_dir).st_mtime_ns
+                if not rescan and scanned.get(hour_dir) == mtime_ns:
+                    continue
+
+                rows = []
+                with os.scandir(hour_dir) as entries:
+                    for entry in entries:
+                        match = MS_REGEX.match(entry.name)
+                        if match is not None:
+                            rows.append(
+                                (
+                                    entry.path,
+                                    datapath,
+                                    date,
+                                    match.group("time"),
+                                    match.group("band"),
+                                    hour_dir,
+                                )
+                            )
+
+                with self.connection:
+                    self.connection.execute(
+                        "DELETE FROM files WHERE hour_dir = ?", (hour_dir,)
+                    )
+                    self.connection.executemany(
+                        "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", rows
+                    )
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO scanned VALUES (?, ?)",
+                        (hour_dir, mtime_ns),
+                    )
+                nscanned += 1
+
+        # forget the files of hour directories which were removed from disk
+        cataloged = self.connection.execute(
+            "SELECT DISTINCT hour_dir FROM files WHERE datapath = ? AND date = ?",
+            (datapath, date),
+        )
+        removed = [(hour_dir,) for (hour_dir,) in cataloged if hour_dir not in found]
+        with self.connection:
+            self.connection.executemany("DELETE FROM files WHERE hour_dir = ?", removed)
+            self.connection.executemany(
+                "DELETE FROM scanned WHERE hour_dir = ?", removed
+            )
+
+        return nscanned
+
+    def files(
+        self, datapath: Path, date: str, exclude_subbands: Iterable[str] = ()
+    ) -> List[Path]:
+        """Get all cataloged files for a date, sorted by time then subband.
+
+        Parameters
+        ----------
+        datapath : Path
+            The root data directory the files were found under.
+        date : str
+            The date, formatted YYYY-MM-DD.
+        exclude_subbands : Iterable[str]
+            Subbands to leave out, e.g. ["13MHz"]
+
+        Returns
+        -------
+        List[Path]
+            The paths of all files.
+        """
+        exclude_subbands = list(exclude_subbands)
+        query = "SELECT path FROM files WHERE datapath = ? AND date = ?"
+        if len(exclude_subbands) > 0:
+            query += f" AND subband NOT IN ({','.join('?' * len(exclude_subbands))})"
+        query += " ORDER BY time, subband"
+
+        rows = self.connection.execute(
+            query, [_normalize(datapath), date, *exclude_subbands]
+        )
+        return [Path(path) for (path,) in rows]
+
+    def integration(self, datapath: Path, time: str) -> List[Path]:
+        """Get the files of every subband for one integration.
+
+        Parameters
+        ----------
+        datapath : Path
+            The root data directory the files were found under.
+        time : str
+            The timestamp of the integration formatted YYYYMMDD_HHMMSS.
+
+        Returns
+        -------
+        List[Path]
+            The paths of all files, sorted by subband.
+        """
+        rows = self.connection.execute(
+            "SELECT path FROM files WHERE datapath = ? AND time = ? ORDER BY subband",
+            (_normalize(datapath), time),
+        )
+        return [Path(path) for (path,) in rows]
+
+
+def _normalize(datapath: Path) -> str:
+    return os.path.abspath(datapath)
+
+
+def _subdirs(path: Path) -> List[str]:
+    with os.scandir(path) as entries:
+        return sorted(entry.path for entry in entries if entry.is_dir())
+
+
+def main():
+    """Command line script to update and query the MS file catalog."""
+    parser = argparse.ArgumentParser(
+        prog="ovro_ms_catalog",
+        description=(
+            "Incrementally catalogs the MS files for a date and prints their paths."
+        ),
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("catalog", type=Path, help="The SQLite catalog file.")
+    parser.add_argument(
+        "datapath", type=Path, help="The root directory with one directory per subband."
+    )
+    parser.add_argument("date", type=str, help="The date to catalog, YYYY-MM-DD.")
+    parser.add_argument(
+        "--exclude",
+        nargs="*",
+        default=[],
+        help="Subbands to leave out of the listing, e.g. 13MHz",
+    )
+    parser.add_argument(
+        "--rescan",
+        action="store_true",
+        help="List every hour directory even if it has not changed.",
+    )
+    args = parser.parse_args()
+
+    if DATE_DIR_REGEX.match(args.date) is None:
+        raise ValueError("Input date must be a date in the format YYYY-MM-DD")
+
+    with MSCatalog(args.catalog) as catalog:
+        catalog.update(args.datapath, args.date, rescan=args.rescan)
+        for path in catalog.files(args.datapath, args.date, args.exclude):
+            print(path)
@@ -0,0 +1,116 @@
+# -*- mode: python; coding: utf-8 -*-
+# Copyright (c) 2024, Owens Valley Radio Observatory Long Wavelength Array
+# All rights reserved.
+
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+WSCLEAN = "/opt/bin/wsclean"
+WSCLEAN_OPTIONS = [
+    "-multiscale",
+    *["-multiscale-scale-bias", "0.8"],
+    *["-pol", "IV"],
+    *["-size", "4096", "4096"],
+    *["-scale", "0.03125"],
+    *["-niter", "0"],
+    *["-casa-mask", "/home/pipeline/cleanmask.mask/"],
+    *["-mgain", "0.85"],
+    *["-weight", "briggs", "0"],
+]
+
+
+def node_resources() -> Tuple[int, float]:
+    """Detect the cores and memory available to this process.
+
+    Returns
+    -------
+    cores : int
+        The number of cores this process may run on.
+    memory : float
+        The total memory of the node in GB.
+    """
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+
+    memory = os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 1024**3
+
+    return cores, memory
+
+
+class WSCleanJob:
+    """A single wsclean imaging run.
+
+    Parameters
+    ----------
+    name : str
+        The image name prefix passed to wsclean -name.
+    files : List[Path]
+        The measurement sets to image together.
+    """
+
+    def __init__(self, name: str, files: List[Path]):
+        self.name = name
+        self.files = files
+        self.seconds = None
+
+    def command(self, cores: int, memory: float) -> List[str]:
+        """The wsclean command using cores threads and memory GB."""
+        return [
+            WSCLEAN,
+            *["-j", str(cores)],
+            *["-abs-mem", f"{memory:.1f}"],
+            *WSCLEAN_OPTIONS,
+            *["-name", self.name],
+            *map(str, self.files),
+        ]
+
+
+def run_wsclean_jobs(
+    jobs: List[WSCleanJob], cores: int, memory: float, verbose: bool = True
+):
+    """Run wsclean jobs concurrently, splitting cores and memory between them.
+
+    All jobs are waited on before any failure is raised. The run time of
+    each job is stored on its seconds attribute.
+
+    Parameters
+    ----------
+    jobs : List[WSCleanJob]
+        The imaging jobs to run.
+    cores : int
+        The number of cores shared by all jobs.
+    memory : float
+        Memory in GB shared by all jobs.
+    verbose : bool
+        Print the run time of each job.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        If any of the wsclean runs failed.
+    """
+    job_cores = max(cores // len(jobs), 1)
+    job_memory = memory / len(jobs)
+
+    # wsclean does its own threading, keep BLAS from adding more
+    env = {**os.environ, "OPENBLAS_NUM_THREADS": "1"}
+
+    def run(job: WSCleanJob) -> subprocess.CompletedProcess:
+        tstart = time.perf_counter()
+        proc = subprocess.run(job.command(job_cores, job_memory), env=env)
+        job.seconds = time.perf_counter() - tstart
+        if verbose:
+            print(f"\twsclean {Path(job.name).name} took {job.seconds:.1f}s")
+        return proc
+
+    with ThreadPoolExecutor(len(jobs)) as pool:
+        procs = list(pool.map(run, jobs))
+
+    for proc in procs:
+        proc.check_returncode()
@@ -0,0 +1,175 @@
+# -*- mode: python; coding: utf-8 -*-
+# Copyright (c) 2024, Owens Valley Radio Observatory Long Wavelength Array
+# All rights reserved.
+
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Hashable, List
+
+import numpy as np
+
+FFMPEG = str(Path(sys.executable).parent / "ffmpeg")
+FRAMERATE = 12.5
+
+
+class MovieWriter:
+    """Encode rendered frames into a movie while they are being rendered.
+
+    Raw RGB frames are piped straight into an ffmpeg subprocess, which is
+    started when the first frame arrives. Frames may be written from any
+    thread and in any order: each has an index, and frames which arrive
+    early wait in memory until every frame before them has been encoded.
+
+    The movie is written as MPEG-TS, so several parts written by separate
+    runs can be joined without encoding again, see concat_movies.
+
+    Parameters
+    ----------
+    outname : Path
+        The MPEG-TS file written.
+    framerate : float
+        Frames per second of the movie.
+    on_encoded : Callable
+        Called with the key and index of every frame once it is sent to
+        ffmpeg. The frame is only safely in the file once the movie is closed.
+    """
+
+    def __init__(
+        self, outname: Path, framerate: float = FRAMERATE, on_encoded: Callable = None
+    ):
+        self.outname = Path(outname)
+        self.framerate = framerate
+        self.on_encoded = on_encoded
+        # keys of the frames sent to ffmpeg, in order
+        self.written = []
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._next = 0
+        self._shape = None
+        self._process = None
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _start(self, shape: tuple):
+        import ffmpeg
+
+        height, width = shape[:2]
+        self._shape = shape
+        self._process = (
+            ffmpeg.input(
+                "pipe:",
+                format="rawvideo",
+                pix_fmt="rgb24",
+                s=f"{width}x{height}",
+                framerate=self.framerate,
+            )
+            .output(
+                str(self.outname), format="mpegts", vcodec="libx264", pix_fmt="yuv420p"
+            )
+            .overwrite_output()
+            .run_async(pipe_stdin=True, cmd=FFMPEG)
+        )
+
+    def _encode(self, frame: np.ndarray):
+        if self._process is None:
+            self._start(frame.shape)
+        elif frame.shape != self._shape:
+            raise ValueError(
+                f"Frame shape {frame.shape} does not match the movie {self._shape}"
+            )
+
+        self._process.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).data)
+
+    def write(self, index: int, frame: np.ndarray, key: Hashable = None):
+        """Add a frame to the movie.
+
+        Parameters
+        ----------
+        index : int
+            The position of the frame in the movie, counting from 0.
+        frame : np.ndarray
+            RGB image of shape (height, width, 3) and dtype uint8.
+        key : Hashable
+            Identifies the frame in written, e.g. the timestamp of the window.
+        """
+        if frame.ndim != 3 or frame.shape[2] != 3:
+            raise ValueError(f"Frames must be RGB images, got shape {frame.shape}")
+
+        with self._lock:
+            if self._closed:
+                # starting ffmpeg again would overwrite the finished movie
+                raise ValueError(f"The movie {self.outname} is already closed.")
+            if index < self._next or index in self._pending:
+                raise ValueError(f"Frame {index} was already written.")
+
+            self._pending[index] = (key, frame)
+            while self._next in self._pending:
+                key, frame = self._pending.pop(self._next)
+                self._encode(frame)
+                self.written.append(key)
+                if self.on_encoded is not None:
+                    self.on_encoded(key, self._next)
+                self._next += 1
+
+    def close(self) -> List[Hashable]:
+        """Finish the movie.
+
+        Frames still waiting for an earlier frame which never arrived are
+        dropped, so the movie never skips a frame.
+
+        Returns
+        -------
+        List[Hashable]
+            The keys of all frames in the movie, in order.
+
+        Raises
+        ------
+        subprocess.CalledProcessError
+            If ffmpeg failed.
+        """
+        with self._lock:
+            self._closed = True
+            self._pending.clear()
+            if self._process is not None:
+                process, self._process = self._process, None
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    # ffmpeg already exited, its return code says why
+                    pass
+                retcode = process.wait()
+                if retcode != 0:
+                    raise subprocess.CalledProcessError(retcode, process.args)
+
+            return list(self.written)
+
+
+def concat_movies(parts: List[Path], outname: Path):
+    """Join MPEG-TS movies written by MovieWriter into one file without encoding.
+
+    Parameters
+    ----------
+    parts : List[Path]
+        The movies to join, in order.
+    outname : Path
+        The joined movie, e.g. an mp4 file.
+    """
+    import ffmpeg
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt") as part_list:
+        for part in parts:
+            part_list.write(f"file '{Path(part).absolute()}'\n")
+        part_list.flush()
+
+        ffmpeg.input(part_list.name, format="concat", safe=0).output(
+            str(outname), c="copy"
+        ).overwrite_output().run(cmd=FFMPEG)
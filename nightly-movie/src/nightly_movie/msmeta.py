@@ -0,0 +1,110 @@
+# -*- mode: python; coding: utf-8 -*-
+# Copyright (c) 2024, Owens Valley Radio Observatory Long Wavelength Array
+# All rights reserved.
+
+import threading
+from pathlib import Path
+
+from astropy.time import Time, TimeDelta
+
+
+class MSMetadata:
+    """The observation parameters of a measurement set.
+
+    Parameters
+    ----------
+    start : float
+        The TIME of the first row, the middle of the first integration, in
+        MJD seconds.
+    integration_time : float
+        The INTERVAL of the first row in seconds.
+    freq : float
+        The reference frequency of the first spectral window in MHz.
+    nchan : int
+        The number of channels of the first spectral window.
+    nantennas : int
+        The number of rows of the ANTENNA table.
+    """
+
+    def __init__(
+        self,
+        start: float,
+        integration_time: float,
+        freq: float,
+        nchan: int,
+        nantennas: int,
+    ):
+        self.start = start
+        self.integration_time = integration_time
+        self.freq = freq
+        self.nchan = nchan
+        self.nantennas = nantennas
+
+    @property
+    def time(self) -> Time:
+        """The time the models of the integration are evaluated at.
+
+        Half an integration after start, as naive_calibration did with the
+        BeginTime of casatools.ms.getscansummary.
+        """
+        return Time(self.start / 86400, format="mjd", scale="utc") + TimeDelta(
+            self.integration_time / 2, format="sec"
+        )
+
+
+def read_metadata(filename: Path) -> MSMetadata:
+    """Read the metadata of a measurement set from its tables.
+
+    Only one cell of the main table and the small SPECTRAL_WINDOW and ANTENNA
+    subtables are read, which takes about a millisecond. casatools.ms instead
+    builds a summary of every scan in the data.
+
+    Parameters
+    ----------
+    filename : Path
+        The MS directory.
+
+    Returns
+    -------
+    MSMetadata
+        The metadata of the MS.
+    """
+    from casatools import table
+
+    filename = str(filename)
+    tb = table()
+    try:
+        tb.open(filename)
+        start = tb.getcell("TIME", 0)
+        integration_time = tb.getcell("INTERVAL", 0)
+        tb.close()
+
+        tb.open(f"{filename}/SPECTRAL_WINDOW")
+        freq = tb.getcell("REF_FREQUENCY", 0) / 1e6
+        nchan = int(tb.getcell("NUM_CHAN", 0))
+        tb.close()
+
+        tb.open(f"{filename}/ANTENNA")
+        nantennas = tb.nrows()
+    finally:
+        tb.close()
+        tb.done()
+
+    return MSMetadata(start, integration_time, freq, nchan, nantennas)
+
+
+_METADATA = {}
+_METADATA_LOCK = threading.Lock()
+
+
+def get_metadata(filename: Path) -> MSMetadata:
+    """Get the metadata of a measurement set, read once per process.
+
+    Working copies share the metadata of the file they were copied from, as
+    calibration and flagging leave these tables alone.
+    """
+    key = Path(filename).name
+    with _METADATA_LOCK:
+        if key not in _METADATA:
+            _METADATA[key] = read_metadata(filename)
+        return _METADATA[key]
@@ -0,0 +1,155 @@
+# -*- mode: python; coding: utf-8 -*-
+# Copyright (c) 2024, Owens Valley Radio Observatory Long Wavelength Array
+# All rights reserved.
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Iterable, List
+
+
+class Stage:
+    """A single step of a Pipeline.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage used in progress messages.
+    function : Callable
+        Called with the output of the previous stage (or the input item for
+        the first stage). Its return value is passed to the next stage.
+    workers : int
+        How many items may be in this stage at once.
+    """
+
+    def __init__(self, name: str, function: Callable, workers: int = 1):
+        if workers < 1:
+            raise ValueError(f"Stage {name} must have at least one worker.")
+
+        self.name = name
+        self.function = function
+        self.workers = workers
+
+
+class Pipeline:
+    """Run items through a sequence of stages, overlapping stages across items.
+
+    Every stage has its own pool of worker threads, so while one item is in
+    a later stage the next item can already be in an earlier one. The stage
+    functions should spend their time in subprocesses or worker processes
+    (rsync, CASA, wsclean, plotting pools) rather than in Python code.
+
+    Parameters
+    ----------
+    stages : List[Stage]
+        The stages every item goes through, in order.
+    max_in_flight : int
+        The maximum number of items between the start of the first stage and
+        the end of the last stage. Bounds how far e.g. copying can run ahead
+        of imaging.
+    verbose : bool
+        Print the time each item spent in each stage.
+    on_failure : Callable
+        Called without arguments whenever a stage raises, e.g. to cancel a
+        resource the items still in the pipeline wait for.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        max_in_flight: int = 2,
+        verbose=True,
+        on_failure: Callable = None,
+    ):
+        if len(stages) == 0:
+            raise ValueError("A Pipeline needs at least one stage.")
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1.")
+
+        self.stages = stages
+        self.max_in_flight = max_in_flight
+        self.verbose = verbose
+        self.on_failure = on_failure
+
+    def _run_stage(self, stage: Stage, item: Any):
+        tstart = time.perf_counter()
+        result = stage.function(item)
+        if self.verbose:
+            print(f"\t{stage.name} {item} took {time.perf_counter() - tstart:.1f}s")
+        return result
+
+    def run(self, items: Iterable) -> List:
+        """Run all items through every stage.
+
+        If any stage raises, no new items are started. Items already in the
+        pipeline are finished and then the first exception is raised. If the
+        calling thread is interrupted instead, e.g. by a signal handler that
+        raises, the exception is raised at once: items are not advanced to
+        their next stage, but the stages already running are left to finish
+        in the background.
+
+        Parameters
+        ----------
+        items : Iterable
+            The inputs to the first stage.
+
+        Returns
+        -------
+        List
+            The return value of the last stage for every item, in input order.
+        """
+        executors = [
+            ThreadPoolExecutor(stage.workers, thread_name_prefix=stage.name)
+            for stage in self.stages
+        ]
+        in_flight = threading.Semaphore(self.max_in_flight)
+        failed = threading.Event()
+        interrupted = threading.Event()
+        finished = []
+
+        def submit(stage_ind: int, output: Future, item: Any):
+            future = executors[stage_ind].submit(
+                self._run_stage, self.stages[stage_ind], item
+            )
+            future.add_done_callback(partial(advance, stage_ind, output))
+
+        def advance(stage_ind: int, output: Future, future: Future):
+            exception = future.exception()
+            if exception is not None:
+                failed.set()
+                if self.on_failure is not None:
+                    self.on_failure()
+                in_flight.release()
+                output.set_exception(exception)
+            elif stage_ind == len(self.stages) - 1:
+                in_flight.release()
+                output.set_result(future.result())
+            elif not interrupted.is_set():
+                submit(stage_ind + 1, output, future.result())
+
+        try:
+            for item in items:
+                in_flight.acquire()
+                if failed.is_set():
+                    break
+                output = Future()
+                finished.append(output)
+                submit(0, output, item)
+
+            # wait for everything started to finish before raising
+            exceptions = [output.exception() for output in finished]
+        except BaseException:
+            interrupted.set()
+            for executor in executors:
+                executor.shutdown(wait=False)
+            raise
+
+        for executor in executors:
+            executor.shutdown(wait=True)
+
+        for exception in exceptions:
+            if exception is not None:
+                raise exception
+
+        return [output.result() for output in finished]
@@ -0,0 +1,301 @@
+# -*- mode: python; coding: utf-8 -*-
+# Copyright (c) 2024, Owens Valley Radio Observatory Long Wavelength Array
+# All rights reserved.
+
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Tuple
+
+import numpy as np
+from astropy.time import Time
+
+from .ephemeris import BODIES, BodyEphemeris
+
+if TYPE_CHECKING:
+    from astropy.io.fits import Header
+    from astropy.wcs import WCS
+    from matplotlib.figure import Figure
+
+# color scale limits in Jy/beam, keyed by whether the snapshot is the high band
+COLOR_LIMITS = {True: (-5, 50), False: (-5, 250)}
+
+MARKER_STYLE = {
+    "linestyle": "none",
+    "marker": "o",
+    "ms": 3,
+    "markerfacecolor": "none",
+    "markeredgewidth": 0.5,
+    "color": "white",
+}
+LABEL_STYLE = {
+    "color": "white",
+    "fontsize": "xx-small",
+    "horizontalalignment": "right",
+    "verticalalignment": "bottom",
+}
+
+
+# rows of the downsampled image read from a FITS file at once
+STRIP_ROWS = 64
+
+
+def read_snapshot(
+    filename: Path, downsample: int = 1
+) -> Tuple[np.ndarray, "Header", Tuple[int, int]]:
+    """Read the first frequency and Stokes plane of a wsclean FITS image.
+
+    The file is memory mapped and closed before returning. Only the bytes of
+    the plane are read, and when downsampling they are read and averaged a
+    strip of rows at a time, so the full resolution plane is never in memory.
+
+    Parameters
+    ----------
+    filename : Path
+        The FITS image.
+    downsample : int
+        Average the plane in blocks of downsample x downsample pixels.
+
+    Returns
+    -------
+    data : np.ndarray
+        The (downsampled) plane in native byte order.
+    header : Header
+        A copy of the primary header.
+    shape : Tuple[int, int]
+        The shape of the full resolution plane.
+    """
+    from astropy.io import fits
+
+    with fits.open(filename, memmap=True) as hdul:
+        hdu = hdul[0]
+        header = hdu.header.copy()
+        shape = hdu.shape[-2:]
+
+        if downsample == 1:
+            data = hdu.section[0, 0]
+        else:
+            step = STRIP_ROWS * downsample
+            data = np.concatenate(
+                [
+                    downsample_image(
+                        hdu.section[0, 0, start : start + step], downsample
+                    )
+                    for start in range(0, shape[0] - downsample + 1, step)
+                ]
+            )
+
+    return data.astype(data.dtype.newbyteorder("="), copy=False), header, shape
+
+
+def downsample_image(data: np.ndarray, factor: int) -> np.ndarray:
+    """Average blocks of factor x factor pixels.
+
+    Pixels at the edges which do not fill a whole block are dropped.
+    """
+    if factor == 1:
+        return data
+
+    ny, nx = data.shape[0] // factor, data.shape[1] // factor
+    blocks = data[: ny * factor, : nx * factor].reshape(ny, factor, nx, factor)
+    return blocks.mean(axis=(1, 3), dtype=np.float64).astype(data.dtype)
+
+
+class SnapshotRenderer:
+    """Plot snapshots of one band, reusing one figure for every frame.
+
+    The figure, axes, color normalization, labels and markers are made for
+    the first snapshot. Every later snapshot only swaps the image data, the
+    WCS, the marker positions and the text.
+
+    Parameters
+    ----------
+    highband : bool
+        Use the color scale of the high band.
+    downsample : int
+        Average the images in blocks of downsample x downsample pixels before
+        plotting. Frames are much smaller than the images, so e.g. 4 is not
+        visible for 4096 x 4096 images.
+    """
+
+    def __init__(self, highband: bool, downsample: int = 1):
+        if downsample < 1:
+            raise ValueError("downsample must be at least 1.")
+
+        self.highband = highband
+        self.downsample = downsample
+        self.fig = None
+
+        self._lock = threading.Lock()
+        self._shape = None
+
+    def _build(self, shape: Tuple[int, int], wcs: "WCS"):
+        from astropy.coordinates import SkyCoord
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.colors import Normalize
+        from matplotlib.figure import Figure
+
+        from .utils import ATEAM_SOURCES
+
+        # no pyplot, the figure is never shown and lives as long as the renderer
+        self.fig = Figure(dpi=200, figsize=(6.4, 3.5))
+        FigureCanvasAgg(self.fig)
+        self.axes = self.fig.subplots(
+            1, 2, sharex=True, sharey=True, subplot_kw={"projection": wcs}
+        )
+        self._shape = shape
+
+        ny, nx = shape
+        norm = Normalize(*COLOR_LIMITS[self.highband])
+        # the images keep the pixel coordinates of the full resolution image
+        extent = (-0.5, nx - 0.5, -0.5, ny - 0.5)
+        blank = np.zeros((max(ny // self.downsample, 1), max(nx // self.downsample, 1)))
+        self._images = [
+            ax.imshow(blank, norm=norm, origin="lower", aspect="equal", extent=extent)
+            for ax in self.axes
+        ]
+        self.axes[0].set_title("I")
+        self.axes[1].set_title("V * 10")
+
+        self._sources = SkyCoord(list(ATEAM_SOURCES.values()))
+        names = BODIES + list(ATEAM_SOURCES)
+        self._markers = [ax.plot([], [], **MARKER_STYLE)[0] for ax in self.axes]
+        self._labels = [
+            [ax.annotate(name, (0, 0), **LABEL_STYLE) for name in names]
+            for ax in self.axes
+        ]
+
+        self._date = self.fig.text(
+            0.5,
+            0.075,
+            "",
+            horizontalalignment="center",
+            backgroundcolor="k",
+            color="w",
+            verticalalignment="center",
+        )
+        self._title = self.fig.suptitle("")
+
+        xmax = nx - 0.5
+        ymax = ny - 0.5
+        for ax in self.axes:
+            for x, y, direction in [
+                (xmax // 2, -150, "S"),
+                (-150, ymax // 2, "E"),
+                (xmax + 150, ymax // 2, "W"),
+            ]:
+                ax.text(
+                    x,
+                    y,
+                    direction,
+                    horizontalalignment="center",
+                    verticalalignment="center",
+                )
+
+    def update(self, filename: List[Path], ephemeris: BodyEphemeris = None) -> "Figure":
+        """Draw a snapshot into the figure.
+
+        Not thread safe, use render or save to share a renderer between threads.
+
+        Parameters
+        ----------
+        filename : List[Path]
+            The Stokes I and V FITS images.
+        ephemeris : BodyEphemeris
+            Precomputed positions of the bodies in BODIES. Evaluated for this
+            snapshot alone if not given.
+
+        Returns
+        -------
+        Figure
+            The figure of the renderer.
+        """
+        from astropy.wcs import WCS
+
+        from .beam import OVRO_LOCATION
+        from .utils import NAME_REGEX
+
+        image_i, header, shape = read_snapshot(filename[0], self.downsample)
+        image_v, _, _ = read_snapshot(filename[1], self.downsample)
+
+        central_freq = header["CRVAL3"] / 1e6
+        header["TIMESYS"] = "utc"
+        header["RADESYSa"] = "ICRS"
+        wcs = WCS(header).slice(np.s_[0, 0])
+
+        if self.fig is None or shape != self._shape:
+            self._build(shape, wcs)
+        else:
+            # the phase center follows zenith, so every snapshot has its own WCS
+            for ax in self.axes:
+                ax.reset_wcs(wcs)
+
+        self._images[0].set_data(image_i)
+        self._images[1].set_data(image_v * 10)
+
+        obstime = Time(
+            header["DATE-OBS"], format="isot", scale="utc", location=OVRO_LOCATION
+        )
+        if ephemeris is None or ephemeris.bodies != BODIES:
+            ephemeris = BodyEphemeris(obstime)
+        body_coords = ephemeris.altaz(obstime)
+
+        # one transform for all bodies and one for all sources
+        xpix, ypix = (
+            np.concatenate(pix)
+            for pix in zip(
+                wcs.world_to_pixel(body_coords), wcs.world_to_pixel(self._sources)
+            )
+        )
+        for marker, labels in zip(self._markers, self._labels):
+            marker.set_data(xpix, ypix)
+            for label, x, y in zip(labels, xpix, ypix):
+                label.xy = label.xyann = (x, y)
+
+        bandname = NAME_REGEX.match(str(filename[0])).group("name")
+        self._date.set_text(header["DATE-OBS"] + " UTC")
+        self._title.set_text(header["TELESCOP"] + f"\n{bandname} {central_freq:.3f}MHz")
+
+        return self.fig
+
+    def render(
+        self, filename: List[Path], ephemeris: BodyEphemeris = None
+    ) -> np.ndarray:
+        """Render a snapshot to an RGB image.
+
+        Parameters
+        ----------
+        filename : List[Path]
+            The Stokes I and V FITS images.
+        ephemeris : BodyEphemeris
+            Precomputed positions of the bodies.
+
+        Returns
+        -------
+        np.ndarray
+            The plot as a (height, width, 3) uint8 array, e.g. a movie frame.
+        """
+        with self._lock:
+            fig = self.update(filename, ephemeris=ephemeris)
+            fig.canvas.draw()
+            return np.ascontiguousarray(np.asarray(fig.canvas.buffer_rgba())[..., :3])
+
+    def save(self, filename: List[Path], outname: str, ephemeris: BodyEphemeris = None):
+        """Plot a snapshot to an image file."""
+        with self._lock:
+            self.update(filename, ephemeris=ephemeris).savefig(outname)
+
+
+_RENDERERS = {}
+_RENDERERS_LOCK = threading.Lock()
+
+
+def get_renderer(highband: bool, downsample: int = 1) -> SnapshotRenderer:
+    """Get the renderer of a band shared by this process.
+
+    Worker processes which plot many snapshots only build each figure once.
+    """
+    key = (highband, downsample)
+    with _RENDERERS_LOCK:
+        if key not in _RENDERERS:
+            _RENDERERS[key] = SnapshotRenderer(highband, downsample=downsample)
+        return _RENDERERS[key]
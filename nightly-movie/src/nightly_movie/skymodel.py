@@ -0,0 +1,157 @@
+# -*- mode: python; coding: utf-8 -*-
+# Copyright (c) 2024, Owens Valley Radio Observatory Long Wavelength Array
+# All rights reserved.
+
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, List
+
+import numpy as np
+from astropy.time import Time
+
+if TYPE_CHECKING:
+    from .beam import BeamModel
+
+# the sky model of the naive calibration
+CALIBRATOR_SOURCES = [
+    {
+        "label": "Cas A",
+        "flux": 16530,
+        "alpha": -0.72,
+        "ref_freq": 80.0,  # MHz
+        "position": "J2000 23h23m24s +58d48m54s",
+    },
+    {
+        "label": "Cyg A",
+        "flux": 16300,
+        "alpha": -0.58,
+        "ref_freq": 80.00,  # MHz
+        "position": "J2000 19h59m28.35663s +40d44m02.0970s",
+    },
+    {
+        "label": "Tau A",
+        "flux": 1770,
+        "alpha": -0.27,
+        "ref_freq": 80.00,  # MHz
+        "position": "J2000 05h34m31.94s +22d00m52.2s",
+    },
+    {
+        "label": "Vir A",
+        "flux": 2400,
+        "alpha": -0.86,
+        "ref_freq": 80.00,  # MHz
+        "position": "J2000 12h30m49.42338s +12d23m28.0439s",
+    },
+]
+
+
+def write_componentlist(
+    componentlist_name: Path, sources: List[dict], fluxes: np.ndarray, freq: float
+):
+    """Write a CASA component list of point sources.
+
+    Parameters
+    ----------
+    componentlist_name : Path
+        The component list table written.
+    sources : List[dict]
+        Sources with a label, position and alpha (spectral index).
+    fluxes : np.ndarray
+        Apparent [I, Q, U, V] of each source at freq, shape (sources, 4).
+    freq : float
+        The reference frequency of the fluxes in MHz.
+    """
+    from casatools import componentlist
+
+    cl = componentlist()
+    cl.done()
+    for src, flux in zip(sources, fluxes):
+        cl.addcomponent(
+            flux=flux,
+            polarization="Stokes",
+            dir=src["position"],
+            index=[src["alpha"], 0, 0, 0],
+            spectrumtype="spectral index",
+            freq=f"{freq:.2f}MHz",
+            label=src["label"],
+        )
+
+    cl.rename(str(componentlist_name))
+    cl.done()
+
+
+class ComponentListFactory:
+    """Make the calibrator component lists of many subbands at once.
+
+    The fluxes of every source at every frequency, including the beam
+    attenuation, come from one vectorized evaluation. Each list is named by
+    its time and frequency, so a list made earlier for the same integration,
+    by this or an earlier run, is reused.
+
+    Parameters
+    ----------
+    outdir : Path
+        The directory the component lists are written to.
+    sources : List[dict]
+        The sky model, see CALIBRATOR_SOURCES.
+    model : BeamModel
+        The beam. The one of get_beam_model if None.
+    """
+
+    def __init__(
+        self,
+        outdir: Path,
+        sources: List[dict] = CALIBRATOR_SOURCES,
+        model: "BeamModel" = None,
+    ):
+        self.outdir = Path(outdir)
+        self.sources = sources
+        self.model = model
+        self._lock = threading.Lock()
+
+    def path(self, obstime: Time, freq: float) -> Path:
+        """The component list of a time and frequency in MHz."""
+        timestamp = obstime.utc.strftime("%Y%m%dT%H%M%S")
+        return self.outdir / f"ateam_{timestamp}_{freq:.3f}MHz.cl"
+
+    def fluxes(self, obstime: Time, freqs: np.ndarray) -> np.ndarray:
+        """Apparent [I, Q, U, V] of every source, shape (freqs, sources, 4)."""
+        from .beam import apparent_fluxes
+
+        return apparent_fluxes(self.sources, obstime, freqs, model=self.model)
+
+    def make(self, obstime: Time, freqs: np.ndarray) -> List[Path]:
+        """Get the component list of each frequency, writing the missing ones.
+
+        Parameters
+        ----------
+        obstime : Time
+            A single time.
+        freqs : np.ndarray
+            Frequencies in MHz, e.g. the reference frequency of each subband.
+
+        Returns
+        -------
+        List[Path]
+            The component list of each frequency.
+        """
+        freqs = np.atleast_1d(np.asarray(freqs, dtype=float))
+        paths = [self.path(obstime, freq) for freq in freqs]
+
+        with self._lock:
+            missing = [ind for ind, path in enumerate(paths) if not path.exists()]
+            if len(missing) == 0:
+                return paths
+
+            self.outdir.mkdir(parents=True, exist_ok=True)
+            fluxes = self.fluxes(obstime, freqs[missing])
+            for ind, flux in zip(missing, fluxes):
+                # rename into place so a crash never leaves half a table
+                tmpname = paths[ind].with_name(f".{paths[ind].name}.{os.getpid()}")
+                shutil.rmtree(tmpname, ignore_errors=True)
+                write_componentlist(tmpname, self.sources, flux, freqs[ind])
+                os.replace(tmpname, paths[ind])
+
+        return paths
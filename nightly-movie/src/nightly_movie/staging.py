@@ -0,0 +1,353 @@
+# -*- mode: python; coding: utf-8 -*-
+# Copyright (c) 2024, Owens Valley Radio Observatory Long Wavelength Array
+# All rights reserved.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Union
+
+# reflink: copy-on-write clone of every file, only possible within one filesystem
+#          that supports it (e.g. XFS, btrfs). Near free and uses no extra space.
+# copy: plain parallel copy of the data without compression.
+# rsync: the rsync -r behavior copy_files used to have, without compression.
+# auto: reflink if the source and destination support it, otherwise copy.
+#
+# MS directories are never hardlinked: CASA rewrites the FLAG, HISTORY and
+# model/corrected column files in place, which would modify the raw data.
+STRATEGIES = ["auto", "reflink", "copy", "rsync"]
+
+_REFLINK_SUPPORT = {}
+_REFLINK_LOCK = threading.Lock()
+
+
+def _reflink(inname: Path, outname: Path):
+    subprocess.run(
+        ["cp", "-r", "--reflink=always", str(inname), str(outname)],
+        check=True,
+        capture_output=True,
+    )
+
+
+def _copy(inname: Path, outname: Path):
+    shutil.copytree(str(inname), str(outname))
+
+
+def _rsync(inname: Path, outname: Path):
+    subprocess.run(["rsync", "-r", f"{inname}/", str(outname)], check=True)
+
+
+def reflink_supported(inname: Path, outdir: Path) -> bool:
+    """Check whether files can be cloned from inname's filesystem into outdir.
+
+    The check is done once per pair of filesystems by cloning a single file.
+    """
+    key = (os.stat(inname).st_dev, os.stat(outdir).st_dev)
+    with _REFLINK_LOCK:
+        if key not in _REFLINK_SUPPORT:
+            probe = Path(inname)
+            if probe.is_dir():
+                probe = next((p for p in probe.rglob("*") if p.is_file()), None)
+
+            supported = False
+            if probe is not None:
+                target = Path(outdir) / f".reflink-probe-{os.getpid()}"
+                try:
+                    _reflink(probe, target)
+                    supported = True
+                except (subprocess.CalledProcessError, OSError):
+                    pass
+                finally:
+                    if target.exists():
+                        target.unlink()
+            _REFLINK_SUPPORT[key] = supported
+
+        return _REFLINK_SUPPORT[key]
+
+
+def stage_file(inname: Path, outname: Path, strategy: str = "auto") -> str:
+    """Make a working copy of a single MS directory.
+
+    Any existing outname is replaced.
+
+    Parameters
+    ----------
+    inname : Path
+        The directory to copy.
+    outname : Path
+        The location of the copy.
+    strategy : str
+        One of STRATEGIES.
+
+    Returns
+    -------
+    str
+        The strategy used.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(
+            f"Unknown staging strategy {strategy}. Use one of {STRATEGIES}"
+        )
+
+    outname = Path(outname)
+    outname.parent.mkdir(parents=True, exist_ok=True)
+    if outname.exists():
+        shutil.rmtree(outname)
+
+    if strategy == "auto":
+        strategy = "reflink" if reflink_supported(inname, outname.parent) else "copy"
+
+    if strategy == "reflink":
+        _reflink(inname, outname)
+    elif strategy == "copy":
+        _copy(inname, outname)
+    else:
+        _rsync(inname, outname)
+
+    return strategy
+
+
+def stage_files(
+    filenames: Union[List[Path], Path],
+    outdir: Path,
+    strategy: str = "auto",
+    workers: int = 4,
+) -> List[Path]:
+    """Make working copies of many MS directories concurrently.
+
+    Parameters
+    ----------
+    filenames : List[Path] | Path
+        Directories to copy.
+    outdir : Path
+        Directory to copy the files into.
+    strategy : str
+        One of STRATEGIES.
+    workers : int
+        Number of directories copied at once.
+
+    Returns
+    -------
+    List[Path]
+        New filename locations
+    """
+    if isinstance(filenames, Path):
+        filenames = [filenames]
+
+    outdir = Path(outdir)
+    outnames = [outdir / fname.name for fname in filenames]
+    if len(filenames) == 0:
+        return outnames
+
+    with ThreadPoolExecutor(max(min(workers, len(filenames)), 1)) as pool:
+        # list forces any exception to be raised here
+        list(
+            pool.map(
+                lambda names: stage_file(*names, strategy=strategy),
+                zip(filenames, outnames),
+            )
+        )
+
+    return outnames
+
+
+class WorkingDirectory:
+    """Working copies in a plain directory, deleted as soon as they are released.
+
+    Parameters
+    ----------
+    path : Path
+        The directory to put working copies in.
+    strategy : str
+        How files are copied, one of STRATEGIES.
+    workers : int
+        Number of directories copied at once.
+    """
+
+    def __init__(self, path: Path, strategy: str = "auto", workers: int = 4):
+        self.path = Path(path)
+        self.strategy = strategy
+        self.workers = workers
+
+    def close(self):
+        pass
+
+    def cancel(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def stage(self, filenames: List[Path]) -> List[Path]:
+        """Copy files into the working directory."""
+        return stage_files(
+            filenames, self.path, strategy=self.strategy, workers=self.workers
+        )
+
+    def release(self, paths: List[Path]):
+        """Delete working copies."""
+        for path in paths:
+            shutil.rmtree(path)
+
+
+def directory_size(path: Path) -> int:
+    """Total size in bytes of all files under path."""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            total += os.lstat(os.path.join(dirpath, name)).st_size
+    return total
+
+
+class ScratchArea:
+    """Node-local scratch space for working copies with a bounded disk budget.
+
+    Staged directories are pinned until released, and deleted as soon as no
+    one uses them: calibration and flagging modify a working copy in place,
+    so a copy is never handed out again once released. Staging blocks until
+    enough copies have been released to fit in the budget, so a pipeline
+    copying ahead of imaging never fills the disk. Once cancelled, e.g. when
+    the pipeline has failed, staging raises instead of waiting.
+
+    Everything is kept in a new directory under root which is removed by
+    close().
+
+    Parameters
+    ----------
+    root : Path
+        The scratch filesystem, e.g. local NVMe or /dev/shm.
+    budget : int
+        Maximum bytes of working copies kept in scratch.
+    strategy : str
+        How files are copied into scratch, one of STRATEGIES.
+    workers : int
+        Number of directories copied at once.
+    """
+
+    def __init__(
+        self, root: Path, budget: int, strategy: str = "auto", workers: int = 4
+    ):
+        Path(root).mkdir(parents=True, exist_ok=True)
+        self.path = Path(tempfile.mkdtemp(dir=root, prefix="nightly_movie_"))
+        self.budget = budget
+        self.strategy = strategy
+        self.workers = workers
+
+        self._condition = threading.Condition()
+        # source path -> [scratch path, size, pins] of the copies in use
+        self._entries = {}
+        self._reserved = 0
+        self._cancelled = False
+
+    def close(self):
+        # nothing left to wait for once the copies are gone
+        self.cancel()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def cancel(self):
+        """Make staging that waits for space, now or later, raise instead."""
+        with self._condition:
+            self._cancelled = True
+            self._condition.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def used(self) -> int:
+        """Bytes used by, or reserved for, working copies."""
+        with self._condition:
+            return self._reserved + sum(entry[1] for entry in self._entries.values())
+
+    def stage(self, filenames: List[Path]) -> List[Path]:
+        """Copy files into scratch and pin them until released.
+
+        Files already staged and not yet released share their copy.
+
+        Parameters
+        ----------
+        filenames : List[Path]
+            Directories to copy.
+
+        Returns
+        -------
+        List[Path]
+            The locations of the working copies.
+        """
+        filenames = [Path(fname) for fname in filenames]
+
+        with self._condition:
+            shared = [fname for fname in filenames if fname in self._entries]
+            for fname in shared:
+                self._entries[fname][2] += 1
+            shared_size = sum(self._entries[fname][1] for fname in shared)
+        missing = [fname for fname in filenames if fname not in shared]
+
+        try:
+            if len(missing) > 0:
+                self._stage_missing(missing, shared_size)
+        except BaseException:
+            self.release([self._entries[fname][0] for fname in shared])
+            raise
+
+        with self._condition:
+            return [self._entries[fname][0] for fname in filenames]
+
+    def _stage_missing(self, missing: List[Path], shared_size: int):
+        size = sum(directory_size(fname) for fname in missing)
+        with self._condition:
+            # the whole request must fit at once, including the copies it shares
+            if size + shared_size > self.budget:
+                raise ValueError(
+                    f"Staging {size + shared_size} bytes exceeds the scratch "
+                    f"budget of {self.budget} bytes."
+                )
+            while self.used + size > self.budget:
+                # copies pinned by a failed pipeline may never be released
+                if self._cancelled:
+                    raise RuntimeError(
+                        "Staging was cancelled while waiting for scratch space."
+                    )
+                self._condition.wait()
+            self._reserved += size
+
+        try:
+            outnames = stage_files(
+                missing, self.path, strategy=self.strategy, workers=self.workers
+            )
+        finally:
+            with self._condition:
+                self._reserved -= size
+                self._condition.notify_all()
+
+        with self._condition:
+            for fname, outname in zip(missing, outnames):
+                self._entries[fname] = [outname, directory_size(outname), 1]
+
+    def release(self, paths: List[Path]):
+        """Unpin working copies, deleting those no longer in use.
+
+        Parameters
+        ----------
+        paths : List[Path]
+            Working copies returned by stage.
+        """
+        paths = [Path(path) for path in paths]
+        with self._condition:
+            for source, entry in list(self._entries.items()):
+                if entry[0] in paths:
+                    entry[2] -= 1
+                    if entry[2] == 0:
+                        shutil.rmtree(entry[0])
+                        del self._entries[source]
+            self._condition.notify_all()
@@ -0,0 +1,45 @@
+import stat
+import sys
+
+import numpy as np
+import pytest
+
+from nightly_movie import beam, movie
+
+
+@pytest.fixture()
+def beam_dir(tmp_path, monkeypatch):
+    az, el = np.meshgrid(np.linspace(0, 360, 64), np.linspace(0, 90, 64))
+    azelgrid = np.stack([az, el])
+    # cells below the horizon are not finite in the simulated beams
+    azelgrid[:, :2, :] = np.nan
+    np.save(tmp_path / "azelgrid.npy", azelgrid)
+
+    rng = np.random.default_rng(42)
+    np.savez(
+        tmp_path / "beamIQUV_50.0.npz",
+        **{pol: rng.uniform(size=az.shape) for pol in "IQUV"},
+    )
+    monkeypatch.setattr(beam, "BEAM_FILE_PATH", str(tmp_path))
+    monkeypatch.setattr(beam, "BEAM_CACHE_PATH", str(tmp_path / "cache"))
+
+    return tmp_path
+
+
+@pytest.fixture()
+def fake_ffmpeg(tmp_path, monkeypatch):
+    # copies the raw frames piped to it into the output file
+    script = tmp_path / "ffmpeg"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import shutil, sys\n"
+        "outname = sys.argv[-2]\n"
+        "if 'fail' in outname:\n"
+        "    sys.exit(1)\n"
+        "with open(outname, 'wb') as outfile:\n"
+        "    shutil.copyfileobj(sys.stdin.buffer, outfile)\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(movie, "FFMPEG", str(script))
+
+    return tmp_path
@@ -0,0 +1,127 @@
+import numpy as np
+from astropy.time import Time
+
+from nightly_movie import beam
+
+
+def test_grid_index_matches_brute_force(beam_dir):
+    azelgrid = np.load(beam_dir / "azelgrid.npy")
+    index = beam.GridIndex(azelgrid)
+
+    rng = np.random.default_rng(0)
+    az = rng.uniform(0, 360, 50)
+    el = rng.uniform(10, 90, 50)
+
+    flat_grid = azelgrid.reshape(2, -1)
+    dists = np.sqrt(
+        (flat_grid[0] - az[:, None]) ** 2 + (flat_grid[1] - el[:, None]) ** 2
+    )
+    expected = np.nanargmin(dists, axis=1)
+
+    np.testing.assert_array_equal(index.query(az, el), expected)
+
+
+def test_src_iquv_batched(beam_dir):
+    src_beam = beam.Beam(50.0, Time("2024-03-23T03:00:00", format="isot"))
+
+    az = np.array([10.0, 100.0, 250.0])
+    el = np.array([20.0, 45.0, 80.0])
+    batched = src_beam.srcIQUV(az, el)
+
+    for ind in range(az.size):
+        single = src_beam.srcIQUV(az[ind], el[ind])
+        for pol_batch, pol_single in zip(batched, single):
+            assert np.ndim(pol_single) == 0
+            assert pol_batch[ind] == pol_single
+
+
+def test_beams_share_memory_mapped_store(beam_dir):
+    obstime = Time("2024-03-23T03:00:00", format="isot")
+    beam1 = beam.Beam(50.0, obstime)
+    beam2 = beam.Beam(50.0, obstime)
+
+    # beam grids are only read on first use
+    assert not (beam_dir / "cache").exists()
+    beam1.srcIQUV(10.0, 20.0)
+    assert (beam_dir / "cache" / "beamIQUV_50.0_I.npy").exists()
+    for pol in "IQUV":
+        pol_beam = getattr(beam1, f"{pol}beam")
+        assert isinstance(pol_beam, np.memmap)
+        assert pol_beam is getattr(beam2, f"{pol}beam")
+
+    with np.load(beam_dir / "beamIQUV_50.0.npz") as beamIQUV:
+        np.testing.assert_array_equal(beam1.Ibeam, beamIQUV["I"])
+
+
+def test_beam_model_interpolates_frequency(beam_dir):
+    with np.load(beam_dir / "beamIQUV_50.0.npz") as beamIQUV:
+        low = {pol: beamIQUV[pol] for pol in "IQUV"}
+    high = {pol: 2 * val for pol, val in low.items()}
+    np.savez(beam_dir / "beamIQUV_70.0.npz", **high)
+
+    model = beam.BeamModel(beam.get_beam_store())
+    np.testing.assert_array_equal(model.freqs, [50.0, 70.0])
+
+    az = np.array([10.0, 100.0, 250.0])
+    el = np.array([20.0, 45.0, 80.0])
+    freqs = np.array([40.0, 50.0, 55.0, 70.0, 80.0])
+    scale = model.srcIQUV(az, el, freqs)
+    assert scale.shape == (4, freqs.size, az.size)
+
+    index = model.store.grid_index.query(az, el)
+    for pol_ind, pol in enumerate("IQUV"):
+        expected = low[pol].flat[index]
+        np.testing.assert_allclose(scale[pol_ind, 0], expected)
+        np.testing.assert_allclose(scale[pol_ind, 1], expected)
+        np.testing.assert_allclose(scale[pol_ind, 2], 1.25 * expected)
+        np.testing.assert_allclose(scale[pol_ind, 3], 2 * expected)
+        np.testing.assert_allclose(scale[pol_ind, 4], 2 * expected)
+
+    np.testing.assert_allclose(model.grid(60.0)["V"], 1.5 * low["V"])
+
+
+def test_apply_beams_matches_single_sources(beam_dir):
+    from astropy.coordinates import AltAz
+
+    from nightly_movie.catalog import get_source_coord
+
+    obstime = Time("2024-03-23T03:00:00", format="isot")
+    src_beam = beam.Beam(50.0, obstime)
+    sources = [
+        {"label": label, "flux": 1000.0, "alpha": -0.7, "ref_freq": 80.0}
+        for label in ["Cas A", "Cyg A", "Vir A", "Cen A"]
+    ]
+
+    fluxes = src_beam.apply_beams(sources)
+    assert fluxes.shape == (len(sources), 4)
+
+    ovro_altaz = AltAz(obstime=obstime, location=beam.OVRO_LOCATION)
+    for source, flux in zip(sources, fluxes):
+        altaz = get_source_coord(source["label"]).transform_to(ovro_altaz)
+        expected = beam._flux80_47(1000.0, -0.7, 50.0, 80.0)
+        if altaz.alt.deg >= 10:
+            expected = expected * np.array(
+                src_beam.srcIQUV(altaz.az.deg, altaz.alt.deg)
+            )
+        else:
+            expected = expected * np.ones(4)
+        np.testing.assert_allclose(flux, expected)
+        np.testing.assert_allclose(src_beam.apply_beam(source), expected)
+
+
+def test_apparent_fluxes_all_frequencies(beam_dir):
+    np.savez(
+        beam_dir / "beamIQUV_70.0.npz",
+        **{pol: np.full((64, 64), 0.5) for pol in "IQUV"},
+    )
+    obstime = Time("2024-03-23T03:00:00", format="isot")
+    sources = [
+        {"label": label, "flux": 1000.0, "alpha": -0.7, "ref_freq": 80.0}
+        for label in ["Cas A", "Cyg A", "Vir A"]
+    ]
+    freqs = np.array([41.0, 55.0, 73.0])
+
+    fluxes = beam.apparent_fluxes(sources, obstime, freqs)
+    assert fluxes.shape == (3, 3, 4)
+    for freq, flux in zip(freqs, fluxes):
+        np.testing.assert_allclose(flux, beam.Beam(freq, obstime).apply_beams(sources))
@@ -0,0 +1,91 @@
+import json
+import shutil
+
+import pytest
+
+from nightly_movie.calcache import BandpassCache, model_hash, normalize_bad_ants
+
+
+def _solve(cache, date, subbands):
+    tables = {}
+    for band in subbands:
+        tables[band] = cache.path(band, date)
+        tables[band].mkdir(parents=True)
+    sources = {
+        band: f"/lustre/data/{band}/{date}_030006_{band}.ms" for band in subbands
+    }
+    return tables, sources
+
+
+def test_normalize_bad_ants():
+    assert normalize_bad_ants("12,3") == ["3", "12"]
+    assert normalize_bad_ants([12, 3, 3]) == ["3", "12"]
+    assert normalize_bad_ants("") == []
+
+
+def test_model_hash():
+    sources = [{"label": "Cas A", "flux": 16530}]
+    assert model_hash(sources) == model_hash([{"flux": 16530, "label": "Cas A"}])
+    assert model_hash(sources) != model_hash([{"label": "Cas A", "flux": 16000}])
+
+
+def test_bandpass_cache_lookup(tmp_path):
+    cache = BandpassCache(tmp_path / "bcal")
+    assert cache.lookup("20240323", ["55MHz"], "3,12", "model") == {}
+
+    tables, sources = _solve(cache, "20240323", ["55MHz", "73MHz"])
+    cache.record("20240323", tables, sources, "12,3", "model")
+    tables, sources = _solve(cache, "20240320", ["55MHz", "82MHz"])
+    cache.record("20240320", tables, sources, "3,12", "model")
+
+    # a new cache only reads the index
+    cache = BandpassCache(tmp_path / "bcal")
+    assert cache.lookup("20240323", ["55MHz", "73MHz", "82MHz"], "3,12", "model") == {
+        "55MHz": cache.path("55MHz", "20240323"),
+        "73MHz": cache.path("73MHz", "20240323"),
+    }
+    # nearby nights fill in, the closest first
+    assert cache.lookup(
+        "20240322", ["55MHz", "73MHz", "82MHz"], "3,12", "model", max_days=2
+    ) == {
+        "55MHz": cache.path("55MHz", "20240323"),
+        "73MHz": cache.path("73MHz", "20240323"),
+        "82MHz": cache.path("82MHz", "20240320"),
+    }
+    # different flags or sky model are stale
+    assert cache.lookup("20240323", ["55MHz"], "3", "model") == {}
+    assert cache.lookup("20240323", ["55MHz"], "3,12", "other") == {}
+
+
+def test_bandpass_cache_remove(tmp_path):
+    cache = BandpassCache(tmp_path / "bcal")
+    tables, sources = _solve(cache, "20240323", ["55MHz", "73MHz"])
+    cache.record("20240323", tables, sources, "", "model")
+
+    cache.remove("20240323", ["55MHz"])
+    assert not cache.path("55MHz", "20240323").exists()
+    assert cache.lookup("20240323", ["55MHz", "73MHz"], "", "model") == {
+        "73MHz": cache.path("73MHz", "20240323")
+    }
+
+
+def test_bandpass_cache_unreadable(tmp_path):
+    cache = BandpassCache(tmp_path)
+    cache.index_path.write_text('{"55MHz/20240323": {"sub')
+
+    with pytest.warns(UserWarning, match="treating every table as missing"):
+        assert cache.lookup("20240323", ["55MHz"], "", "model") == {}
+
+
+def test_bandpass_cache_missing_table(tmp_path):
+    cache = BandpassCache(tmp_path / "bcal")
+    for date in ["20240323", "20240322"]:
+        tables, sources = _solve(cache, date, ["55MHz"])
+        cache.record(date, tables, sources, "", "model")
+
+    shutil.rmtree(cache.path("55MHz", "20240323"))
+    # the next closest night is used and the missing table forgotten
+    assert cache.lookup("20240323", ["55MHz"], "", "model", max_days=1) == {
+        "55MHz": cache.path("55MHz", "20240322")
+    }
+    assert list(json.loads(cache.index_path.read_text())) == ["55MHz/20240322"]
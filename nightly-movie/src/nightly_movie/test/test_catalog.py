@@ -0,0 +1,56 @@
+import json
+
+import pytest
+from astropy.coordinates import SkyCoord
+
+from nightly_movie import catalog, utils
+
+
+def test_ateam_offline(monkeypatch):
+    def no_network(name):
+        raise AssertionError(f"Tried to resolve {name} over the network.")
+
+    monkeypatch.setattr(SkyCoord, "from_name", no_network)
+
+    assert len(utils.ATEAM_SOURCES) == 11
+    for name, coord in utils.ATEAM_SOURCES.items():
+        assert isinstance(coord, SkyCoord)
+
+    assert "Cas A" in utils.ATEAM_SOURCES
+    with pytest.raises(KeyError):
+        utils.ATEAM_SOURCES["3C 196"]
+
+
+def test_resolved_sources_cached(tmp_path, monkeypatch):
+    resolved = []
+
+    def from_name(name):
+        resolved.append(name)
+        return SkyCoord(123.4, 48.2, unit="deg")
+
+    monkeypatch.setattr(SkyCoord, "from_name", from_name)
+    monkeypatch.setattr(catalog, "_COORDS", {})
+
+    cache_path = tmp_path / "sources.json"
+    coord = catalog.get_source_coord("3C 196", cache_path=str(cache_path))
+    assert resolved == ["3C 196"]
+    assert json.loads(cache_path.read_text()) == {"3C 196": [123.4, 48.2]}
+
+    # a new process only has the on-disk cache
+    monkeypatch.setattr(catalog, "_COORDS", {})
+    cached = catalog.get_source_coord("3C 196", cache_path=str(cache_path))
+    assert resolved == ["3C 196"]
+    assert cached.separation(coord).deg < 1e-8
+
+
+def test_corrupt_source_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        SkyCoord, "from_name", lambda name: SkyCoord(123.4, 48.2, unit="deg")
+    )
+    monkeypatch.setattr(catalog, "_COORDS", {})
+
+    cache_path = tmp_path / "sources.json"
+    cache_path.write_text('{"3C 196": [123.4,')
+    with pytest.warns(UserWarning, match="resolving every source again"):
+        catalog.get_source_coord("3C 196", cache_path=str(cache_path))
+    assert json.loads(cache_path.read_text()) == {"3C 196": [123.4, 48.2]}
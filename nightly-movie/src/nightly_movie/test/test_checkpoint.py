@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from nightly_movie.checkpoint import Manifest
+
+
+def test_manifest_persists(tmp_path):
+    path = tmp_path / "manifest.json"
+    manifest = Manifest(path)
+    assert manifest.completed("20240323_030006") == []
+
+    manifest.mark("20240323_030006", "copied", working_files=["a.ms"])
+    manifest.mark("20240323_030006", "calibrated", working_files=["a.ms"])
+    manifest.mark("20240323_030006", "calibrated")
+    manifest.mark("20240323_031006", "copied")
+
+    reloaded = Manifest(path)
+    assert reloaded.completed("20240323_030006") == ["copied", "calibrated"]
+    assert reloaded.get("20240323_030006", "working_files") == ["a.ms"]
+    assert reloaded.get("20240323_031006", "working_files", []) == []
+
+    reloaded.clear("20240323_031006")
+    assert Manifest(path).completed("20240323_031006") == []
+    assert Manifest(path).completed("20240323_030006") == ["copied", "calibrated"]
+
+    reloaded.clear()
+    assert json.loads(path.read_text()) == {}
+
+    reloaded.remove()
+    assert not path.exists()
+
+
+def test_manifest_unreadable(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text('{"20240323_030006": {"compl')
+
+    with pytest.warns(UserWarning, match="starting over"):
+        manifest = Manifest(path)
+    assert manifest.completed("20240323_030006") == []
+
+    manifest.mark("20240323_030006", "copied")
+    assert Manifest(path).completed("20240323_030006") == ["copied"]
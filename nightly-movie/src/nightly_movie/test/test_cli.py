@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from astropy.time import Time
+
+from nightly_movie import cli
+from nightly_movie.checkpoint import Manifest
+
+
+def _window(date_dir, minute):
+    window = cli.Window(Time(f"2024-03-23T03:{minute:02d}:00"), [], date_dir)
+    for band in cli.BANDS:
+        for fits_file in window.fits_files(band):
+            Path(fits_file).write_text("image")
+    return window
+
+
+def _has_images(window):
+    return all(Path(fname).exists() for fname in window.fits_files("highband"))
+
+
+def test_movie_parts(fake_ffmpeg):
+    manifest = Manifest(fake_ffmpeg / "manifest.json")
+    windows = [_window(fake_ffmpeg, minute) for minute in range(5)]
+    frame = np.zeros((4, 6, 3), dtype=np.uint8)
+
+    with cli.MovieParts(manifest, windows, fake_ffmpeg, 3) as movie_parts:
+        # the window at index 1 failed
+        for window in windows[:1] + windows[2:]:
+            for band in cli.BANDS:
+                movie_parts.write(window, band, frame)
+
+        # a part is finished as soon as all of its frames are encoded
+        assert manifest.completed(windows[4].time_str) == ["encoded", "plotted"]
+        assert not _has_images(windows[4])
+        # the images are kept until the part is closed
+        assert manifest.completed(windows[0].time_str) == ["encoded"]
+        assert manifest.get(windows[0].time_str, "frames")["lowband"] == [
+            str(fake_ffmpeg / f"ovro_nightly_lowband_{windows[0].time_str}.ts"),
+            0,
+        ]
+        assert _has_images(windows[0])
+
+    assert windows[0].parts["highband"] == str(
+        fake_ffmpeg / f"ovro_nightly_highband_{windows[0].time_str}.ts"
+    )
+    assert not _has_images(windows[0])
+    # dropped after the missing window, plotted again by the next run
+    assert manifest.completed(windows[2].time_str) == []
+    assert _has_images(windows[2])
+
+    with pytest.raises(ValueError, match="is closed"):
+        movie_parts.write(windows[1], "highband", frame)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from astropy import units
+from astropy.coordinates import AltAz, get_body
+from astropy.time import Time, TimeDelta
+
+from nightly_movie.beam import OVRO_LOCATION
+from nightly_movie.ephemeris import BODIES, BodyEphemeris
+
+
+def direct_altaz(time):
+    altaz = AltAz(obstime=time, location=OVRO_LOCATION)
+    return [
+        get_body(body, time, location=OVRO_LOCATION).transform_to(altaz)
+        for body in BODIES
+    ]
+
+
+def test_ephemeris_matches_get_body():
+    start = Time("2024-03-23T02:00:00", scale="utc")
+    times = start + TimeDelta(np.arange(0, 3600, 300) * units.s)
+    ephemeris = BodyEphemeris(times)
+
+    # on a precomputed time, between two and just past the end
+    for time in [
+        times[3],
+        times[3] + TimeDelta(137 * units.s),
+        times[-1] + TimeDelta(8 * units.s),
+    ]:
+        coords = ephemeris.altaz(time)
+        assert coords.shape == (len(BODIES),)
+        for coord, expected in zip(coords, direct_altaz(time)):
+            # well below a 0.03 degree pixel
+            assert coord.separation(expected).deg < 0.005
+
+
+def test_ephemeris_single_time():
+    time = Time("2024-03-23T02:00:00", scale="utc")
+    coords = BodyEphemeris(time).altaz(time)
+    for coord, expected in zip(coords, direct_altaz(time)):
+        assert coord.separation(expected).deg < 1e-8
+
+
+def test_source_visibility():
+    from nightly_movie.catalog import ATEAM_POSITIONS, get_source_coord
+    from nightly_movie.ephemeris import SourceVisibility
+
+    start = Time("2024-03-23T00:00:00", scale="utc")
+    times = start + TimeDelta(np.arange(0, 24 * 3600, 600) * units.s)
+    visibility = SourceVisibility(times)
+
+    assert visibility.sources == list(ATEAM_POSITIONS)
+    assert visibility.alt.shape == (len(ATEAM_POSITIONS), len(times))
+
+    casa = get_source_coord("Cas A").transform_to(
+        AltAz(obstime=times, location=OVRO_LOCATION)
+    )
+    az, alt = visibility.altaz("Cas A")
+    np.testing.assert_allclose(alt, casa.alt.deg)
+    np.testing.assert_allclose(az, casa.az.deg)
+
+    ind = visibility.max_elevation_index("Cas A")
+    assert ind == np.argmax(casa.alt.deg)
+    assert visibility.time_of_max_elevation("Cas A") == times[ind]
+
+    above = visibility.above_horizon(ind, min_alt=10)
+    assert "Cas A" in above
+    assert all(
+        visibility.alt[visibility.sources.index(name), ind] >= 10 for name in above
+    )
+
+    with pytest.raises(KeyError, match="3C 196"):
+        visibility.altaz("3C 196")
@@ -0,0 +1,96 @@
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from nightly_movie.filecatalog import MSCatalog
+
+
+def make_files(datapath, names):
+    for name in names:
+        band = name.split("_")[-1][:-3]
+        hour = name.split("_")[1][:2]
+        path = datapath / band / "2024-03-23" / hour / name
+        path.mkdir(parents=True)
+
+
+def test_catalog_incremental(tmp_path):
+    datapath = tmp_path / "slow"
+    make_files(
+        datapath,
+        [
+            "20240323_030006_13MHz.ms",
+            "20240323_030006_18MHz.ms",
+            "20240323_040016_18MHz.ms",
+            "20240323_030006_23MHz.ms",
+        ],
+    )
+
+    with MSCatalog(tmp_path / "catalog.sqlite") as catalog:
+        # three date directories and four hour directories
+        assert catalog.update(datapath, "2024-03-23") == 7
+        assert catalog.update(datapath, "2024-03-23") == 0
+
+        files = catalog.files(datapath, "2024-03-23", exclude_subbands=["13MHz"])
+        assert [f.name for f in files] == [
+            "20240323_030006_18MHz.ms",
+            "20240323_030006_23MHz.ms",
+            "20240323_040016_18MHz.ms",
+        ]
+        assert files[0] == datapath / "18MHz/2024-03-23/03/20240323_030006_18MHz.ms"
+
+    make_files(datapath, ["20240323_040016_23MHz.ms"])
+
+    # the catalog persists, only the new hour directory and its parent are listed
+    with MSCatalog(tmp_path / "catalog.sqlite") as catalog:
+        assert catalog.update(datapath, "2024-03-23") == 2
+        assert [f.name for f in catalog.integration(datapath, "20240323_040016")] == [
+            "20240323_040016_18MHz.ms",
+            "20240323_040016_23MHz.ms",
+        ]
+        assert catalog.files(Path("elsewhere"), "2024-03-23") == []
+
+
+def test_catalog_forgets_removed_hours(tmp_path):
+    datapath = tmp_path / "slow"
+    make_files(datapath, ["20240323_030006_18MHz.ms", "20240323_040016_18MHz.ms"])
+
+    with MSCatalog(tmp_path / "catalog.sqlite") as catalog:
+        catalog.update(datapath, "2024-03-23")
+        shutil.rmtree(datapath / "18MHz" / "2024-03-23" / "04")
+
+        # only the changed date directory is listed again
+        assert catalog.update(datapath, "2024-03-23") == 1
+        assert [f.name for f in catalog.files(datapath, "2024-03-23")] == [
+            "20240323_030006_18MHz.ms"
+        ]
+
+
+def test_catalog_readonly(tmp_path):
+    datapath = tmp_path / "slow"
+    make_files(datapath, ["20240323_030006_18MHz.ms"])
+
+    with pytest.raises(sqlite3.OperationalError):
+        MSCatalog(tmp_path / "catalog.sqlite", readonly=True)
+
+    with MSCatalog(tmp_path / "catalog.sqlite") as catalog:
+        catalog.update(datapath, "2024-03-23")
+
+    with MSCatalog(tmp_path / "catalog.sqlite", readonly=True) as catalog:
+        assert len(catalog.integration(datapath, "20240323_030006")) == 1
+        with pytest.raises(sqlite3.OperationalError):
+            catalog.update(datapath, "2024-03-23", rescan=True)
+
+
+def test_catalog_flat_layout(tmp_path):
+    datapath = tmp_path / "slow"
+    for name in ["20240323_030006_18MHz.ms", "20240323_030006_23MHz.ms"]:
+        (datapath / name.split("_")[-1][:-3] / "2024-03-23" / name).mkdir(parents=True)
+
+    with MSCatalog(tmp_path / "catalog.sqlite") as catalog:
+        assert catalog.update(datapath, "2024-03-23") == 2
+        assert [f.name for f in catalog.integration(datapath, "20240323_030006")] == [
+            "20240323_030006_18MHz.ms",
+            "20240323_030006_23MHz.ms",
+        ]
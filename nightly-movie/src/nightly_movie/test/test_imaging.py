@@ -0,0 +1,52 @@
+import stat
+import subprocess
+import time
+
+import pytest
+
+from nightly_movie import imaging
+
+
+@pytest.fixture()
+def fake_wsclean(tmp_path, monkeypatch):
+    script = tmp_path / "wsclean"
+    script.write_text(
+        "#!/bin/sh\n"
+        'echo "$@" > "$(echo "$@" | sed "s/.*-name \\([^ ]*\\).*/\\1/").args"\n'
+        "sleep 1\n"
+        'case "$*" in *fail*) exit 3;; esac\n'
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(imaging, "WSCLEAN", str(script))
+
+    return tmp_path
+
+
+def test_wsclean_jobs_run_concurrently(fake_wsclean):
+    jobs = [
+        imaging.WSCleanJob(str(fake_wsclean / band), [f"{band}.ms"])
+        for band in ["highband", "lowband"]
+    ]
+
+    tstart = time.perf_counter()
+    imaging.run_wsclean_jobs(jobs, cores=32, memory=100, verbose=False)
+    assert time.perf_counter() - tstart < 1.9
+
+    for job in jobs:
+        assert job.seconds >= 1
+        args = (fake_wsclean / (job.name + ".args")).read_text().split()
+        assert args[:4] == ["-j", "16", "-abs-mem", "50.0"]
+        assert args[-1] == job.files[0]
+
+
+def test_wsclean_jobs_failure(fake_wsclean):
+    jobs = [
+        imaging.WSCleanJob(str(fake_wsclean / name), [f"{name}.ms"])
+        for name in ["highband", "fail"]
+    ]
+
+    with pytest.raises(subprocess.CalledProcessError):
+        imaging.run_wsclean_jobs(jobs, cores=4, memory=10, verbose=False)
+
+    # the other job still ran to completion
+    assert jobs[0].seconds >= 1
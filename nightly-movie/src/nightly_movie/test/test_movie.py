@@ -0,0 +1,58 @@
+import subprocess
+
+import numpy as np
+import pytest
+
+from nightly_movie import movie
+
+
+def _frame(value):
+    return np.full((4, 6, 3), value, dtype=np.uint8)
+
+
+def test_movie_writer_orders_frames(fake_ffmpeg):
+    outname = fake_ffmpeg / "movie.ts"
+    with movie.MovieWriter(outname) as writer:
+        for index in [2, 0, 1, 4]:
+            writer.write(index, _frame(index), key=f"window{index}")
+
+        with pytest.raises(ValueError, match="already written"):
+            writer.write(1, _frame(1))
+        with pytest.raises(ValueError, match="does not match"):
+            writer.write(3, np.zeros((2, 2, 3), dtype=np.uint8))
+
+    # frame 3 never arrived, so frame 4 was dropped
+    assert writer.written == ["window0", "window1", "window2"]
+    frames = np.frombuffer(outname.read_bytes(), dtype=np.uint8).reshape(-1, 4, 6, 3)
+    np.testing.assert_array_equal(frames[:, 0, 0, 0], [0, 1, 2])
+
+
+def test_movie_writer_no_frames(fake_ffmpeg):
+    outname = fake_ffmpeg / "movie.ts"
+    assert movie.MovieWriter(outname).close() == []
+    assert not outname.exists()
+
+
+def test_movie_writer_ffmpeg_fails(fake_ffmpeg):
+    writer = movie.MovieWriter(fake_ffmpeg / "fail.ts")
+    try:
+        writer.write(0, _frame(0))
+    except BrokenPipeError:
+        pass
+    with pytest.raises(subprocess.CalledProcessError):
+        writer.close()
+
+
+def test_movie_writer_reports_encoded_frames(fake_ffmpeg):
+    encoded = []
+    writer = movie.MovieWriter(
+        fake_ffmpeg / "movie.ts", on_encoded=lambda *frame: encoded.append(frame)
+    )
+    writer.write(1, _frame(1), key="window1")
+    assert encoded == []
+    writer.write(0, _frame(0), key="window0")
+    assert encoded == [("window0", 0), ("window1", 1)]
+
+    writer.close()
+    with pytest.raises(ValueError, match="already closed"):
+        writer.write(2, _frame(2))
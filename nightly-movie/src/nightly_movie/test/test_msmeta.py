@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from astropy.time import Time
+
+from nightly_movie import msmeta
+
+
+def _make_table(path, columns, nrow):
+    from casatools import table
+
+    tb = table()
+    tb.create(
+        str(path),
+        {
+            name: {"valueType": value_type, "option": 0, "maxlen": 0, "comment": ""}
+            for name, (value_type, _) in columns.items()
+        },
+        nrow=nrow,
+    )
+    for name, (_, values) in columns.items():
+        tb.putcol(name, values)
+    tb.close()
+    tb.done()
+
+
+@pytest.fixture
+def fake_ms(tmp_path):
+    """The tables of an MS that the metadata is read from, for one integration."""
+    path = tmp_path / "20240323_030006_55MHz.ms"
+    start = Time("2024-03-23T03:00:06", format="isot").mjd * 86400
+    _make_table(
+        path,
+        {
+            "TIME": ("double", np.full(6, start)),
+            "INTERVAL": ("double", np.full(6, 10.0)),
+        },
+        6,
+    )
+    _make_table(
+        path / "SPECTRAL_WINDOW",
+        {
+            "REF_FREQUENCY": ("double", np.array([55.1e6])),
+            "NUM_CHAN": ("int", np.array([192], dtype=np.int32)),
+        },
+        1,
+    )
+    _make_table(path / "ANTENNA", {"DISH_DIAMETER": ("double", np.ones(3))}, 3)
+    return path
+
+
+def test_read_metadata(fake_ms):
+    metadata = msmeta.read_metadata(fake_ms)
+
+    assert metadata.integration_time == 10.0
+    assert metadata.freq == pytest.approx(55.1)
+    assert metadata.nchan == 192
+    assert metadata.nantennas == 3
+    assert abs(metadata.time - Time("2024-03-23T03:00:11", format="isot")).sec < 1e-3
+
+
+def test_get_metadata_reads_once(fake_ms, monkeypatch):
+    reads = []
+    read_metadata = msmeta.read_metadata
+    monkeypatch.setattr(msmeta, "_METADATA", {})
+    monkeypatch.setattr(
+        msmeta, "read_metadata", lambda name: reads.append(name) or read_metadata(name)
+    )
+
+    first = msmeta.get_metadata(fake_ms)
+    # a working copy of the same file
+    assert msmeta.get_metadata(fake_ms.parent / "copy" / fake_ms.name) is first
+    assert reads == [fake_ms]
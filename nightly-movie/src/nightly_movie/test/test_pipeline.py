@@ -0,0 +1,82 @@
+import signal
+import threading
+import time
+
+import pytest
+
+from nightly_movie.pipeline import Pipeline, Stage
+
+
+def test_pipeline_results_in_order():
+    pipeline = Pipeline(
+        [Stage("double", lambda x: 2 * x, workers=3), Stage("add", lambda x: x + 1)],
+        max_in_flight=4,
+        verbose=False,
+    )
+
+    assert pipeline.run(range(10)) == [2 * x + 1 for x in range(10)]
+
+
+def test_pipeline_overlaps_stages():
+    second_started = threading.Event()
+
+    def first(item):
+        if item == 1:
+            # only finishes if item 0 reached the second stage concurrently
+            assert second_started.wait(timeout=5)
+        return item
+
+    def second(item):
+        second_started.set()
+        return item
+
+    pipeline = Pipeline(
+        [Stage("first", first), Stage("second", second)],
+        max_in_flight=2,
+        verbose=False,
+    )
+    assert pipeline.run([0, 1]) == [0, 1]
+
+
+def test_pipeline_error_stops_new_items():
+    started = []
+
+    def stage(item):
+        started.append(item)
+        if item == 1:
+            raise RuntimeError("imaging failed")
+        return item
+
+    pipeline = Pipeline([Stage("stage", stage)], max_in_flight=1, verbose=False)
+
+    with pytest.raises(RuntimeError, match="imaging failed"):
+        pipeline.run(range(10))
+
+    assert started == [0, 1]
+
+
+def test_pipeline_interrupt_does_not_wait():
+    release = threading.Event()
+    # never blocks the test for long if run waits after all
+    threading.Timer(10, release.set).start()
+
+    def stage(item):
+        release.wait()
+        return item
+
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+
+    pipeline = Pipeline(
+        [Stage("first", stage), Stage("second", stage)], max_in_flight=2, verbose=False
+    )
+    previous = signal.signal(signal.SIGALRM, interrupt)
+    try:
+        signal.setitimer(signal.ITIMER_REAL, 0.2)
+        tstart = time.perf_counter()
+        with pytest.raises(KeyboardInterrupt):
+            pipeline.run(range(4))
+        assert time.perf_counter() - tstart < 5
+    finally:
+        signal.signal(signal.SIGALRM, previous)
+        release.set()
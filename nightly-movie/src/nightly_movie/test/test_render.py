@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from nightly_movie import render
+
+
+def write_snapshot(path, time_str, ra, size=64, seed=0):
+    header = fits.Header()
+    axes = [
+        ("RA---SIN", ra, -1.0, size / 2),
+        ("DEC--SIN", 37.2, 1.0, size / 2),
+        ("FREQ", 5.0e7, 1.0e6, 1),
+        ("STOKES", 1, 1, 1),
+    ]
+    for ind, (ctype, crval, cdelt, crpix) in enumerate(axes, start=1):
+        header[f"CTYPE{ind}"] = ctype
+        header[f"CRVAL{ind}"] = crval
+        header[f"CDELT{ind}"] = cdelt
+        header[f"CRPIX{ind}"] = crpix
+    header["DATE-OBS"] = time_str
+    header["TELESCOP"] = "OVRO_MMA"
+
+    rng = np.random.default_rng(seed)
+    path.mkdir(parents=True, exist_ok=True)
+    filenames = []
+    for pol in ["I", "V"]:
+        filename = (
+            path / f"{time_str[:10].replace('-', '')}_030006_highband-{pol}-dirty.fits"
+        )
+        data = rng.uniform(-5, 50, size=(1, 1, size, size)).astype(np.float32)
+        fits.writeto(filename, data, header, overwrite=True)
+        filenames.append(str(filename))
+    return filenames
+
+
+def test_downsample_image():
+    data = np.arange(36, dtype=float).reshape(6, 6)
+    np.testing.assert_array_equal(render.downsample_image(data, 1), data)
+    np.testing.assert_array_equal(
+        render.downsample_image(data, 3), [[7.0, 10.0], [25.0, 28.0]]
+    )
+    assert render.downsample_image(data, 4).shape == (1, 1)
+
+
+@pytest.mark.parametrize("downsample", [1, 3, 4])
+def test_read_snapshot(tmp_path, monkeypatch, downsample):
+    # small strips so the image is read in several pieces
+    monkeypatch.setattr(render, "STRIP_ROWS", 2)
+    filename = write_snapshot(tmp_path, "2024-03-23T03:00:06.0", 180.0, size=30)[0]
+    full = fits.getdata(filename)[0, 0]
+
+    data, header, shape = render.read_snapshot(filename, downsample=downsample)
+
+    assert shape == (30, 30)
+    assert header["DATE-OBS"] == "2024-03-23T03:00:06.0"
+    assert data.dtype.isnative
+    np.testing.assert_allclose(
+        data, render.downsample_image(full, downsample), rtol=1e-6
+    )
+
+
+def test_renderer_reuses_figure(tmp_path):
+    first = write_snapshot(tmp_path / "first", "2024-03-23T03:00:06.0", 180.0)
+    second = write_snapshot(tmp_path / "second", "2024-03-23T09:00:06.0", 270.0, seed=1)
+
+    renderer = render.SnapshotRenderer(highband=True)
+    frame = renderer.render(first)
+    fig = renderer.fig
+    assert frame.shape == (700, 1280, 3)
+    assert frame.dtype == np.uint8
+
+    # the second frame reuses the figure but looks like a freshly made one
+    frame = renderer.render(second)
+    assert renderer.fig is fig
+    np.testing.assert_array_equal(
+        frame, render.SnapshotRenderer(highband=True).render(second)
+    )
+    assert not np.array_equal(
+        frame, render.SnapshotRenderer(highband=True).render(first)
+    )
+
+
+def test_renderer_downsample(tmp_path):
+    filenames = write_snapshot(tmp_path, "2024-03-23T03:00:06.0", 180.0)
+
+    frame = render.SnapshotRenderer(highband=False, downsample=4).render(filenames)
+    assert frame.shape == (700, 1280, 3)
+
+    with pytest.raises(ValueError, match="at least 1"):
+        render.SnapshotRenderer(highband=False, downsample=0)
+
+
+def test_get_renderer():
+    assert render.get_renderer(True) is render.get_renderer(True)
+    assert render.get_renderer(True) is not render.get_renderer(False)
+    assert render.get_renderer(True, 4).downsample == 4
@@ -0,0 +1,32 @@
+import numpy as np
+from astropy.time import Time
+
+from nightly_movie import skymodel
+
+
+def test_component_lists_per_frequency(beam_dir, tmp_path):
+    from casatools import componentlist
+
+    factory = skymodel.ComponentListFactory(tmp_path / "cl")
+    obstime = Time("2024-03-23T03:00:00", format="isot")
+    freqs = [41.8, 73.2]
+
+    paths = factory.make(obstime, freqs)
+    assert [path.name for path in paths] == [
+        "ateam_20240323T030000_41.800MHz.cl",
+        "ateam_20240323T030000_73.200MHz.cl",
+    ]
+
+    expected = factory.fluxes(obstime, freqs)
+    cl = componentlist()
+    for path, flux in zip(paths, expected):
+        cl.open(str(path))
+        assert cl.length() == len(skymodel.CALIBRATOR_SOURCES)
+        np.testing.assert_allclose(cl.getfluxvalue(0), flux[0], rtol=1e-6)
+        cl.close()
+    cl.done()
+
+    # lists of the same time and frequency are reused
+    mtimes = [path.stat().st_mtime_ns for path in paths]
+    assert factory.make(obstime, freqs[::-1]) == paths[::-1]
+    assert [path.stat().st_mtime_ns for path in paths] == mtimes
@@ -0,0 +1,152 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from nightly_movie import staging
+from nightly_movie.pipeline import Pipeline, Stage
+
+
+@pytest.mark.parametrize("strategy", ["auto", "copy"])
+def test_stage_files(tmp_path, strategy):
+    filenames = []
+    for band in ["18MHz", "23MHz", "27MHz"]:
+        msname = tmp_path / "in" / f"20240323_030006_{band}.ms"
+        (msname / "ANTENNA").mkdir(parents=True)
+        (msname / "table.f0").write_text(band)
+        (msname / "ANTENNA" / "table.f0").write_text("antennas")
+        filenames.append(msname)
+
+    outdir = tmp_path / "out"
+    # stale copies are replaced
+    (outdir / filenames[0].name / "stale").mkdir(parents=True)
+
+    outnames = staging.stage_files(filenames, outdir, strategy=strategy, workers=2)
+
+    assert outnames == [outdir / fname.name for fname in filenames]
+    for fname, outname in zip(filenames, outnames):
+        assert sorted(p.relative_to(outname) for p in outname.rglob("*")) == sorted(
+            p.relative_to(fname) for p in fname.rglob("*")
+        )
+        assert (outname / "table.f0").read_text() == (fname / "table.f0").read_text()
+
+
+def test_unknown_strategy(tmp_path):
+    with pytest.raises(ValueError, match="Unknown staging strategy"):
+        staging.stage_file(tmp_path / "in.ms", tmp_path / "out.ms", strategy="hardlink")
+
+
+def _make_ms(path, size):
+    path.mkdir(parents=True)
+    (path / "table.f0").write_bytes(b"0" * size)
+    return path
+
+
+def test_scratch_area(tmp_path):
+    first = _make_ms(tmp_path / "in" / "20240323_030006_18MHz.ms", 100)
+    second = _make_ms(tmp_path / "in" / "20240323_030016_18MHz.ms", 100)
+
+    with staging.ScratchArea(tmp_path / "scratch", 150, strategy="copy") as scratch:
+        (staged,) = scratch.stage([first])
+        assert (staged / "table.f0").read_bytes() == (first / "table.f0").read_bytes()
+        assert scratch.used == 100
+
+        # copies in use are shared
+        assert scratch.stage([first]) == [staged]
+        scratch.release([staged])
+        assert staged.exists()
+
+        # and deleted once released by everyone
+        scratch.release([staged])
+        assert not staged.exists()
+        assert scratch.used == 0
+
+        (other,) = scratch.stage([second])
+        assert other.exists()
+        assert scratch.used == 100
+
+        with pytest.raises(ValueError, match="exceeds the scratch budget"):
+            scratch.stage([first, second])
+
+        # nothing stays pinned by a failed request
+        scratch.release([other])
+        assert scratch.used == 0
+        assert scratch.stage([first])[0].exists()
+
+    assert not scratch.path.exists()
+
+
+def test_scratch_area_restages_fresh_copy(tmp_path):
+    source = _make_ms(tmp_path / "in" / "20240323_030006_18MHz.ms", 100)
+
+    with staging.ScratchArea(tmp_path / "scratch", 150, strategy="copy") as scratch:
+        (staged,) = scratch.stage([source])
+        # e.g. flagging and applycal rewrite the working copy
+        (staged / "table.f0").write_bytes(b"1" * 120)
+        (staged / "CORRECTED_DATA").write_bytes(b"1" * 10)
+        scratch.release([staged])
+
+        (staged,) = scratch.stage([source])
+        assert sorted(p.name for p in staged.iterdir()) == ["table.f0"]
+        assert (staged / "table.f0").read_bytes() == (source / "table.f0").read_bytes()
+        assert scratch.used == 100
+
+
+def test_scratch_area_waits_for_release(tmp_path):
+    first = _make_ms(tmp_path / "in" / "20240323_030006_18MHz.ms", 100)
+    second = _make_ms(tmp_path / "in" / "20240323_030016_18MHz.ms", 100)
+
+    with staging.ScratchArea(tmp_path / "scratch", 150, strategy="copy") as scratch:
+        (staged,) = scratch.stage([first])
+        with ThreadPoolExecutor(1) as pool:
+            future = pool.submit(scratch.stage, [second])
+            time.sleep(0.2)
+            assert not future.done()
+
+            scratch.release([staged])
+            (other,) = future.result(timeout=10)
+        assert other.exists()
+        assert scratch.used == 100
+
+
+def test_scratch_area_cancel(tmp_path):
+    first = _make_ms(tmp_path / "in" / "20240323_030006_18MHz.ms", 100)
+    second = _make_ms(tmp_path / "in" / "20240323_030016_18MHz.ms", 100)
+
+    with staging.ScratchArea(tmp_path / "scratch", 150, strategy="copy") as scratch:
+        scratch.stage([first])
+        with ThreadPoolExecutor(1) as pool:
+            future = pool.submit(scratch.stage, [second])
+            time.sleep(0.2)
+            assert not future.done()
+
+            scratch.cancel()
+            with pytest.raises(RuntimeError, match="cancelled"):
+                future.result(timeout=10)
+        assert scratch.used == 100
+
+
+def test_failed_pipeline_cancels_staging(tmp_path):
+    filenames = [
+        _make_ms(tmp_path / "in" / f"20240323_0300{second}_18MHz.ms", 100)
+        for second in ["06", "16", "26"]
+    ]
+
+    def image(staged):
+        # fails without releasing its copy
+        raise RuntimeError("imaging failed")
+
+    with staging.ScratchArea(tmp_path / "scratch", 150, strategy="copy") as scratch:
+        pipeline = Pipeline(
+            [
+                Stage("copy", lambda fname: scratch.stage([fname])),
+                Stage("image", image),
+            ],
+            max_in_flight=2,
+            verbose=False,
+            on_failure=scratch.cancel,
+        )
+        with ThreadPoolExecutor(1) as pool:
+            future = pool.submit(pipeline.run, filenames)
+            with pytest.raises(RuntimeError, match="imaging failed"):
+                future.result(timeout=10)
@@ -1,3 +1,7 @@
+import json
+import os
+import subprocess
+import sys
 from pathlib import Path
 
 import numpy as np
@@ -5,6 +9,7 @@ import pytest
 from astropy import units
 from astropy.time import Time, TimeDelta
 
+import nightly_movie
 from nightly_movie import utils
 
 
@@ -109,6 +114,24 @@ def test_one_group():
         assert expected_groups[key1] == grouped_data[key2]
 
 
+def test_parse_file_times():
+    filenames = [
+        Path("13MHz/2024-03-23/03/20240323_030006_13MHz.ms"),
+        Path("13MHz/2024-03-23/03/20240323_030066_13MHz.ms"),
+        Path("13MHz/2024-12-31/23/20241231_235959_13MHz.ms"),
+    ]
+
+    times = utils.parse_file_times(filenames)
+
+    np.testing.assert_array_equal(
+        times,
+        np.array(
+            ["2024-03-23T03:00:06", "2024-03-23T03:01:06", "2024-12-31T23:59:59"],
+            dtype="datetime64[s]",
+        ),
+    )
+
+
 def test_copy_files(tmp_path):
     indir = tmp_path / "data.ms"
     indir.mkdir()
@@ -163,3 +186,118 @@ def test_central_int():
     returned = utils.get_central_integration(filenames, central_time)
 
     assert expected == returned
+
+
+def test_lazy_imports():
+    heavy = ["casatasks", "casatools", "etcd3", "matplotlib", "astropy.wcs", "scipy"]
+    proc = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, nightly_movie, nightly_movie.utils, nightly_movie.cli; "
+            # submodules load on attribute access without pulling in heavy modules
+            "nightly_movie.ephemeris; "
+            f"print(' '.join(mod for mod in {heavy!r} if mod in sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        # find the package under test even if it is not installed
+        env={**os.environ, "PYTHONPATH": str(Path(nightly_movie.__file__).parents[1])},
+    )
+
+    assert proc.stdout.strip() == ""
+
+    for name in nightly_movie.__all__:
+        assert getattr(nightly_movie, name).__name__ == f"nightly_movie.{name}"
+
+
+def test_file_index():
+    filenames = [
+        Path("18MHz/2024-03-23/03/20240323_030006_18MHz.ms"),
+        Path("13MHz/2024-03-23/03/20240323_030006_13MHz.ms"),
+        Path("13MHz/2024-03-23/03/20240323_030016_13MHz.ms"),
+        Path("13MHz/2024-03-23/03/20240323_030507_13MHz.ms"),
+        Path("18MHz/2024-03-23/03/20240323_030507_18MHz.ms"),
+    ]
+    file_index = utils.FileIndex(filenames)
+
+    assert len(file_index) == 5
+    assert file_index.integrations[0] == {
+        "18MHz": filenames[0],
+        "13MHz": filenames[1],
+    }
+
+    # ties go to the earlier integration
+    central_time = Time("2024-03-23T03:00:11", format="isot")
+    assert file_index.central_integration(central_time) == filenames[:2]
+
+    central_time = Time("2024-03-23T04:00:00", format="isot")
+    assert file_index.central_integration(central_time) == filenames[3:]
+
+    grouped_data = file_index.group(TimeDelta(5 * units.min))
+    assert list(grouped_data.values()) == [filenames[:3], filenames[3:]]
+
+
+class FakeEtcd:
+    """Serves keys from a dict like an etcd3 client, counting the values sent."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.sent = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        self.sent += value is not None
+        return value, None
+
+    def get_prefix(self, prefix, sort_order=None, sort_target="key", limit=None):
+        keys = sorted(
+            (key for key in self.entries if key.startswith(prefix)),
+            reverse=sort_order == "descend",
+        )
+        for key in keys[:limit]:
+            self.sent += 1
+            yield self.entries[key], None
+
+
+@pytest.fixture
+def fake_etcd():
+    def health(flagged):
+        names = ["LWA-003A", "LWA-003B", "LWA-012A", "LWA-250B"]
+        return json.dumps(
+            {"antname": names, "flagged": [name in flagged for name in names]}
+        ).encode()
+
+    return FakeEtcd(
+        {
+            utils.SELFCORR_PREFIX + "1711160000": health(["LWA-250B"]),
+            utils.SELFCORR_PREFIX + "1711170000": health(["LWA-012A", "LWA-003B"]),
+            "/mon/other/1711180000": b"{}",
+        }
+    )
+
+
+def test_get_bad_ants(fake_etcd):
+    assert utils.get_bad_ants(client=fake_etcd) == "3,12"
+    # only the newest entry is sent back
+    assert fake_etcd.sent == 1
+
+    assert utils.get_bad_ants("1711160000", client=fake_etcd) == "250"
+    assert utils.get_bad_ants("", client=fake_etcd) == ""
+    with pytest.raises(KeyError):
+        utils.get_bad_ants("1711150000", client=fake_etcd)
+
+    assert utils.get_bad_ants(client=FakeEtcd({})) == ""
+
+
+def test_load_bad_ants(tmp_path, fake_etcd):
+    path = tmp_path / "bad_ants.json"
+    assert utils.load_bad_ants(path, client=fake_etcd) == "3,12"
+    assert utils.load_bad_ants(path, client=fake_etcd) == "3,12"
+    assert fake_etcd.sent == 1
+
+    path.write_text('{"bad_a')
+    with pytest.warns(UserWarning, match="asking etcd again"):
+        assert utils.load_bad_ants(path, client=fake_etcd) == "3,12"
+    assert fake_etcd.sent == 2
@@ -0,0 +1,36 @@
+import pytest
+
+from nightly_movie.workers import FileTaskError, casa_pool, map_files, render_pool
+
+
+@pytest.fixture(params=[None, 2], ids=["serial", "pool"])
+def executor(request):
+    if request.param is None:
+        yield None
+    else:
+        with casa_pool(request.param) as pool:
+            yield pool
+
+
+def test_map_files(executor):
+    results = map_files(int, ["1", "2", "3"], executor=executor, verbose=False)
+    assert results == [1, 2, 3]
+
+
+def test_map_files_errors(executor):
+    with pytest.raises(FileTaskError, match="int failed for 2 file") as err:
+        map_files(int, ["1", "x", "3", "y"], executor=executor, verbose=False)
+
+    assert list(err.value.failures) == ["x", "y"]
+    assert all(isinstance(exc, ValueError) for exc in err.value.failures.values())
+
+
+def test_render_pool_reuses_workers():
+    import os
+
+    with render_pool(2) as pool:
+        first = {pool.submit(os.getpid).result() for _ in range(4)}
+        second = {pool.submit(os.getpid).result() for _ in range(4)}
+
+    assert len(first | second) <= 2
+    assert os.getpid() not in first
@@ -2,77 +2,106 @@
 # Copyright (c) 2024, Owens Valley Radio Observatory Long Wavelength Array
 # All rights reserved.
 
-# these are necessary to get the images to not need
-# a gui backend
-import shutil
-from functools import partial
-
-import matplotlib  # noqa:
-
-matplotlib.use("Agg")  # noqa:
-
+# Heavy dependencies (casa, etcd3, matplotlib, astropy coordinates and wcs)
+# are imported inside the functions which need them so that importing this
+# module stays fast for worker processes and short command line calls.
 import json
 import re
-import subprocess
+import shutil
+import threading
+import warnings
+from functools import partial
 from pathlib import Path
-from typing import List, Tuple, Union
+from typing import TYPE_CHECKING, Dict, List, Tuple, Union
 
-import etcd3
 import numpy as np
 from astropy import units
-from astropy.coordinates import AltAz, SkyCoord, get_body
-from astropy.io import fits
 from astropy.time import Time, TimeDelta
-from astropy.wcs import WCS
-from casatasks import bandpass, clearcal, flagdata, ft
-from casatools import componentlist, ms
-from matplotlib import pyplot as plt
-from matplotlib.colors import Normalize
 
-from .beam import OVRO_LOCATION, Beam
+from .calcache import model_hash
+from .catalog import ATEAM_POSITIONS, SourceCatalog
+from .checkpoint import write_json
+from .msmeta import get_metadata
+from .skymodel import CALIBRATOR_SOURCES, ComponentListFactory, write_componentlist
+from .staging import stage_files
+from .workers import map_files
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from .beam import Beam
+    from .calcache import BandpassCache
+    from .ephemeris import BodyEphemeris
 
 TIME_REGEX = re.compile(r".*(?P<date>\d{8})_(?P<hms>\d{6})_(?P<band>\d{2}MHz).ms")
 NAME_REGEX = re.compile(r".*\d{8}_\d{6}_(?P<name>[a-zA-Z]*)-.*\.fits$")
-ANTNAME_REGEX = re.compile(r"^(?i)(LWA-)?(?P<num>\d{2,3})[AB].*$")
-
-ATEAM_SOURCES = {
-    name: SkyCoord.from_name(name)
-    for name in [
-        "Cas A",
-        "Cyg A",
-        "Pic A",
-        "Her A",
-        "For A",
-        "Cen A",
-        "Hydra A",
-        "Sgr A",
-        "Pup A",
-        "Tau A",
-        "Vir A",
-    ]
-}
-
-
-def get_bad_ants(latest: Union[str, None] = None) -> str:
-    client = etcd3.client(
-        "etcdv3service",
-        2379,
-        grpc_options=[
-            ("grpc.max_receive_message_length", -1),
-            ("grpc.max_send_message_length", -1),
-        ],
-    )
-    if latest is None:
-        times = [
-            kv.key.decode().lstrip("/mon/anthealth/selfcorr/")
-            for _, kv in client.get_prefix("/mon/anthealth/selfcorr/")
-        ]
-        latest = sorted(times)[-1]
+ANTNAME_REGEX = re.compile(r"^(LWA-)?(?P<num>\d{2,3})[AB].*$", re.IGNORECASE)
+
+# coordinates are only looked up when a source is first used
+ATEAM_SOURCES = SourceCatalog(ATEAM_POSITIONS)
+
+ETCD_HOST = "etcdv3service"
+ETCD_PORT = 2379
+SELFCORR_PREFIX = "/mon/anthealth/selfcorr/"
+
+_ETCD_CLIENTS = {}
+_ETCD_LOCK = threading.Lock()
+
 
+def get_etcd_client(host: str = ETCD_HOST, port: int = ETCD_PORT):
+    """Get the etcd client of this process, connected on first use."""
+    key = (host, port)
+    with _ETCD_LOCK:
+        if key not in _ETCD_CLIENTS:
+            import etcd3
+
+            _ETCD_CLIENTS[key] = etcd3.client(
+                host,
+                port,
+                grpc_options=[
+                    ("grpc.max_receive_message_length", -1),
+                    ("grpc.max_send_message_length", -1),
+                ],
+            )
+        return _ETCD_CLIENTS[key]
+
+
+def get_bad_ants(latest: Union[str, None] = None, client=None) -> str:
+    """Get the antennas flagged by the self-correlation health check.
+
+    Parameters
+    ----------
+    latest : str
+        The timestamp of the entry to read. The newest entry if None.
+    client : etcd3.Etcd3Client
+        The etcd connection. The one of get_etcd_client if None.
+
+    Returns
+    -------
+    str
+        Comma separated antenna numbers, e.g. "3,12". Empty if nothing is flagged.
+    """
     if latest == "":
         return ""
+    if client is None:
+        client = get_etcd_client()
+
+    if latest is None:
+        # keys are timestamps, so the server sends back the newest entry alone
+        entries = list(
+            client.get_prefix(
+                SELFCORR_PREFIX, sort_order="descend", sort_target="key", limit=1
+            )
+        )
+        if len(entries) == 0:
+            return ""
+        value = entries[0][0]
+    else:
+        value = client.get(SELFCORR_PREFIX + latest)[0]
+        if value is None:
+            raise KeyError(f"No antenna health entry {SELFCORR_PREFIX + latest}")
 
-    bad_ants = json.loads(client.get(f"/mon/anthealth/selfcorr/{latest}")[0])
+    bad_ants = json.loads(value)
     flagged = np.array(bad_ants["antname"])[np.where(bad_ants["flagged"])]
 
     nums = []
@@ -85,8 +114,41 @@ def get_bad_ants(latest: Union[str, None] = None) -> str:
     return ",".join(str(x) for x in nums)
 
 
-def perform_cal(filename: Path, bad_ants: str, cal_file: Path, output_prefix: Path):
+def load_bad_ants(path: Path, client=None) -> str:
+    """Get the flagged antennas of a night, asking etcd only the first time.
+
+    Parameters
+    ----------
+    path : Path
+        The JSON file the antennas are kept in for the night.
+    client : etcd3.Etcd3Client
+        The etcd connection. The one of get_etcd_client if None.
+
+    Returns
+    -------
+    str
+        Comma separated antenna numbers, as from get_bad_ants.
+    """
+    path = Path(path)
+    if path.exists():
+        try:
+            with open(path) as ants_file:
+                return json.load(ants_file)["bad_ants"]
+        except (OSError, ValueError, KeyError) as err:
+            warnings.warn(f"Could not read {path}, asking etcd again: {err!r}")
+
+    bad_ants = get_bad_ants(client=client)
+    write_json(path, {"bad_ants": bad_ants})
+    return bad_ants
+
+
+def perform_cal(
+    filename: Path, bad_ants: str, cal_files: Dict[str, Path], output_prefix: Path
+):
+    from casatasks import bandpass, clearcal, flagdata, ft
+
     bcal = Path(get_bcal(str(filename), output_prefix))
+    cal_file = cal_files[TIME_REGEX.match(str(filename)).group("band")]
 
     if not bcal.exists():
         if bad_ants != "":
@@ -101,11 +163,19 @@ def perform_cal(filename: Path, bad_ants: str, cal_file: Path, output_prefix: Pa
         )
 
 
-def naive_calibration(file_dict: dict, output_prefix: Path):
+def naive_calibration(
+    file_dict: dict,
+    output_prefix: Path,
+    file_index: "FileIndex" = None,
+    executor: "Executor" = None,
+    cache: "BandpassCache" = None,
+    max_days: int = 0,
+) -> Dict[str, Path]:
     """Perform a naive 5 component calibration on a set of files.
 
     This function will find the file where Cas A is closest to zenith.
-    Perform a basic calibration from generate_componentlist
+    Each subband is solved against a component list of its own frequency,
+    made by skymodel.ComponentListFactory.
 
     Parameters
     ----------
@@ -113,64 +183,110 @@ def naive_calibration(file_dict: dict, output_prefix: Path):
         Files grouped by time keyed by the central time of the group.
     output_prefix : Path
         The location where data should be saved
+    file_index : FileIndex
+        Index of all files in file_dict, used to look up the central integration.
+        Built from the calibration window if not given.
+    executor : Executor
+        Pool to solve the subbands in concurrently, e.g. workers.casa_pool.
+        Subbands are solved one at a time in this process if None.
+    cache : BandpassCache
+        Reuse valid tables of this or nearby nights, and store new ones, here.
+        Tables are written under output_prefix if None.
+    max_days : int
+        The farthest night a cached table may be reused from.
+
+    Returns
+    -------
+    Dict[str, Path]
+        The bandpass table of each subband.
+
+    Raises
+    ------
+    FileTaskError
+        If the solve failed for any subband. Every subband is attempted first.
     """
+    from .ephemeris import SourceVisibility
 
     # modify flux by the beam?
     # compute calibration paramters
-    obstimes = Time(list(file_dict.keys()))
-    ovro_altaz = AltAz(obstime=obstimes, location=OVRO_LOCATION)
-
-    CasA = ATEAM_SOURCES["Cas A"]
-    CasA_altaz = CasA.transform_to(ovro_altaz)
+    visibility = SourceVisibility(Time(list(file_dict.keys())))
 
     # find time where Cas A alt is highest
-    cal_ind = np.argmax(CasA_altaz.alt)
+    cal_ind = visibility.max_elevation_index("Cas A")
     calibration_key = list(file_dict.keys())[cal_ind]
     # copy file
     cal_group = file_dict[calibration_key]
     #  get central_integration
-    file_group = get_central_integration(cal_group, calibration_key)
-    print("\tCopying Files for calibration")
-    working_file_group = copy_files(file_group, output_prefix)
-
-    cal_file = output_prefix / "ateam.cl"
-    if not cal_file.exists():
-        # sort to get the highest frequency at the end
-        filename = sorted(working_file_group)[-1]
-
-        ms_file = ms()
-        ms_file.open(str(filename))
-        time_info = list(list(ms_file.getscansummary().values())[0].values())[0]
-        obstime = Time(
-            time_info["BeginTime"],
-            format="mjd",
-            scale="utc",
-        ) + TimeDelta(time_info["IntegrationTime"] / 2, format="sec")
-        # get the reference frequency in MHz
-        freq = ms_file.getspectralwindowinfo()["0"]["RefFreq"] / 1e6
-        ms_file.close()
-
-        print("Loading beam")
-        beam = Beam(freq, obstime)
-        print("Generating component list")
-        generate_componentlist(cal_file, beam)
+    if file_index is None:
+        file_index = FileIndex(cal_group)
+    file_group = file_index.central_integration(calibration_key)
+    date = TIME_REGEX.match(str(file_group[0])).group("date")
+    subbands = {
+        TIME_REGEX.match(str(fname)).group("band"): fname for fname in file_group
+    }
 
     print("Getting bad antennas")
-    bad_ants = get_bad_ants()
+    bad_ants = load_bad_ants(output_prefix / "bad_ants.json")
     if bad_ants != "":
-        print("Flagging antennas: {bad_ants}")
+        print(f"Flagging antennas: {bad_ants}")
+    source_hash = model_hash(CALIBRATOR_SOURCES)
+
+    tables = {}
+    bcal_prefix = output_prefix
+    if cache is not None:
+        bcal_prefix = cache.root
+        tables = cache.lookup(
+            date, list(subbands), bad_ants, source_hash, max_days=max_days
+        )
+        for band, table in sorted(tables.items()):
+            # tables are named by the night they were solved for
+            print(f"\tReusing the {band} bandpass table of night {table.stem}")
+        # anything left for this night is missing or stale
+        cache.remove(date, [band for band in subbands if band not in tables])
+
+    solve_group = [fname for band, fname in subbands.items() if band not in tables]
+    if len(solve_group) == 0:
+        return tables
+
+    print("\tCopying Files for calibration")
+    working_file_group = copy_files(solve_group, output_prefix)
+
+    print("Generating component lists")
+    # every subband is modelled at its own frequency
+    metadata = [get_metadata(fname) for fname in working_file_group]
+    cal_files = ComponentListFactory(output_prefix).make(
+        metadata[0].time, [meta.freq for meta in metadata]
+    )
 
     print("Performing Calibration")
     calibration_function = partial(
-        perform_cal, bad_ants=bad_ants, cal_file=cal_file, output_prefix=output_prefix
+        perform_cal,
+        bad_ants=bad_ants,
+        cal_files={
+            TIME_REGEX.match(str(fname)).group("band"): cal_file
+            for fname, cal_file in zip(working_file_group, cal_files)
+        },
+        output_prefix=bcal_prefix,
     )
-    for filename in working_file_group:
-        calibration_function(filename)
+    # every subband is solved independently
+    map_files(calibration_function, working_file_group, executor=executor)
+
+    solved = {
+        TIME_REGEX.match(str(fname)).group("band"): Path(
+            get_bcal(str(fname), bcal_prefix)
+        )
+        for fname in solve_group
+    }
+    if cache is not None:
+        cache.record(date, solved, subbands, bad_ants, source_hash)
+    tables.update(solved)
 
     print("Removing calibration files")
     for path in working_file_group:
         shutil.rmtree(path)
 
+    return tables
+
 
 def partition_files(filenames: List[Path]) -> Tuple[List[Path], List[Path]]:
     """Parition a list of OVRO-LWA files into a high and low bands.
@@ -202,6 +318,108 @@ def partition_files(filenames: List[Path]) -> Tuple[List[Path], List[Path]]:
     return lowband, highband
 
 
+class FileIndex:
+    """Index of OVRO-LWA data files by integration time and subband.
+
+    Built once from a night of file names so time windows and the
+    integrations within them are looked up without re-parsing names.
+
+    Parameters
+    ----------
+    filenames : List[Path]
+        Data files named like YYYYMMDD_HHMMSS_<band>MHz.ms
+    """
+
+    def __init__(self, filenames: List[Path]):
+        self.filenames = list(filenames)
+
+        # unique integration times and the integration each file belongs to
+        self.times, time_inds = np.unique(
+            parse_file_times(self.filenames), return_inverse=True
+        )
+        self.time_inds = time_inds.ravel()
+
+        # integration -> subband -> path
+        self.integrations = [dict() for _ in range(self.times.size)]
+        for fname, time_ind in zip(self.filenames, self.time_inds):
+            band = TIME_REGEX.match(Path(fname).name).group("band")
+            self.integrations[time_ind][band] = fname
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def group(self, time_window: TimeDelta = None) -> dict:
+        """Group the files into time_window windows.
+
+        See group_files for details.
+        """
+        if time_window is None:
+            time_window = TimeDelta(5 * units.min)
+        window = np.timedelta64(int(round(time_window.to_value("sec") * 1e3)), "ms")
+
+        unique_times = self.times
+        if unique_times.size == 0:
+            return dict()
+
+        # each window starts at the first integration not in a previous window
+        # and includes every integration within time_window of that start.
+        starts = []
+        stops = []
+        group_start_ind = 0
+        while group_start_ind < unique_times.size:
+            group_stop_ind = np.searchsorted(
+                unique_times,
+                unique_times[group_start_ind] + window,
+                side="right",
+            )
+            starts.append(group_start_ind)
+            stops.append(group_stop_ind)
+            group_start_ind = group_stop_ind
+        starts = np.asarray(starts, dtype=int)
+        stops = np.asarray(stops, dtype=int)
+
+        # central time is the mean of the integration times in each window
+        offsets = (unique_times - unique_times[starts].repeat(stops - starts)).astype(
+            float
+        )
+        mean_offsets = np.add.reduceat(offsets, starts) / (stops - starts)
+        central_times = Time(unique_times[starts], scale="utc") + TimeDelta(
+            mean_offsets, format="sec"
+        )
+        central_times.format = "isot"
+
+        # files sorted by time, keeping their input order within an integration
+        group_ids = np.repeat(np.arange(starts.size), stops - starts)[self.time_inds]
+        order = np.argsort(self.time_inds, kind="stable")
+        group_bounds = np.searchsorted(group_ids[order], np.arange(starts.size + 1))
+
+        grouped_data = dict()
+        for group_ind, central_time in enumerate(central_times):
+            grouped_data[central_time] = [
+                self.filenames[ind]
+                for ind in order[group_bounds[group_ind] : group_bounds[group_ind + 1]]
+            ]
+
+        return grouped_data
+
+    def closest_integration(self, central_time: Time) -> int:
+        """Get the index of the integration closest to central_time."""
+        target = central_time.utc.datetime64
+        ind = np.searchsorted(self.times, target)
+        if ind == self.times.size or (
+            ind > 0 and target - self.times[ind - 1] <= self.times[ind] - target
+        ):
+            ind -= 1
+        return int(ind)
+
+    def central_integration(self, central_time: Time) -> List[Path]:
+        """Get all files from the integration closest to central_time.
+
+        If a subband is missing from the integration it is ignored.
+        """
+        return list(self.integrations[self.closest_integration(central_time)].values())
+
+
 def group_files(filenames: List[Path], time_window: TimeDelta = None) -> dict:
     """Group all the files in the input directory into 5 minute windows.
 
@@ -222,44 +440,41 @@ def group_files(filenames: List[Path], time_window: TimeDelta = None) -> dict:
         The values are the file names in this window.
     """
 
-    times_to_fnames = dict()
-    if time_window is None:
-        time_window = TimeDelta(5 * units.min)
+    return FileIndex(filenames).group(time_window)
 
-    for fname in filenames:
-        regex_match = TIME_REGEX.match(fname.name)
-        groups = regex_match.groupdict()
-        date, hms = groups["date"], groups["hms"]
-        timeval = Time(
-            f"{date[:4]}-{date[4:6]}-{date[6:8]}T{hms[:2]}:{hms[2:4]}:{hms[4:6]}",
-            format="isot",
-        )
-        if timeval not in times_to_fnames:
-            times_to_fnames[timeval] = [fname]
 
-        else:
-            times_to_fnames[timeval] += [fname]
-
-    time_array = Time(sorted(times_to_fnames.keys()))
-    grouped_data = dict()
-    group_start_ind = 0
-
-    while group_start_ind < len(time_array):
-        group_inds = (
-            np.nonzero(
-                time_array[group_start_ind:] - time_array[group_start_ind]
-                <= time_window
-            )[0]
-            + group_start_ind
-        )
-        central_time = np.mean(time_array[group_inds])
-        grouped_data[central_time] = []
-        for ind in group_inds:
-            grouped_data[central_time] += times_to_fnames[time_array[ind]]
+def parse_file_times(filenames: List[Path]) -> np.ndarray:
+    """Get the timestamps of OVRO-LWA data files from their names.
+
+    Parameters
+    ----------
+    filenames : List[Path]
+        Data files named like YYYYMMDD_HHMMSS_<band>MHz.ms
+
+    Returns
+    -------
+    np.ndarray
+        The timestamp of each file as datetime64[s].
+    """
+    stamps = np.array(
+        [
+            "".join(TIME_REGEX.match(Path(fname).name).group("date", "hms"))
+            for fname in filenames
+        ],
+        dtype=np.int64,
+    ).reshape(-1)
 
-        group_start_ind = group_inds[-1] + 1
+    date, hms = np.divmod(stamps, 10**6)
+    year, month_day = np.divmod(date, 10**4)
+    month, day = np.divmod(month_day, 100)
+    days = (
+        (year - 1970).astype("datetime64[Y]") + (month - 1).astype("timedelta64[M]")
+    ).astype("datetime64[D]") + (day - 1).astype("timedelta64[D]")
 
-    return grouped_data
+    # seconds are added as offsets so out of range values roll over
+    seconds = hms // 10**4 * 3600 + hms // 100 % 100 * 60 + hms % 100
+
+    return days.astype("datetime64[s]") + seconds.astype("timedelta64[s]")
 
 
 def get_central_integration(filenames: List[Path], central_time: Time) -> List[Path]:
@@ -282,26 +497,12 @@ def get_central_integration(filenames: List[Path], central_time: Time) -> List[P
         All files whose timestamp is closest to the desired time
     """
 
-    all_times = []
-    for fname in filenames:
-        regex_match = TIME_REGEX.match(fname.name)
-        groups = regex_match.groupdict()
-        date, hms = groups["date"], groups["hms"]
-        timeval = Time(
-            f"{date[:4]}-{date[4:6]}-{date[6:8]}T{hms[:2]}:{hms[2:4]}:{hms[4:6]}",
-            format="isot",
-        )
-        if timeval not in all_times:
-            all_times.append(timeval)
-    all_times = Time(all_times)
-
-    closest_integration = all_times[(np.abs(all_times - central_time)).argmin()]
-    time_str = closest_integration.strftime("%Y%m%d_%H%M%S")
+    return FileIndex(filenames).central_integration(central_time)
 
-    return [fname for fname in filenames if time_str in fname.name]
 
-
-def copy_files(filenames: List[Path], outdir: Path) -> List[Path]:
+def copy_files(
+    filenames: List[Path], outdir: Path, strategy: str = "auto", workers: int = 4
+) -> List[Path]:
     """Copy All files to the outdir directory.
 
 
@@ -311,197 +512,63 @@ def copy_files(filenames: List[Path], outdir: Path) -> List[Path]:
         Files to copy
     outdir : Path
         Directory to copy the files to
+    strategy : str
+        How to copy the files, one of staging.STRATEGIES.
+        Defaults to a copy-on-write clone when the filesystem supports it,
+        otherwise an uncompressed copy.
+    workers : int
+        The number of files copied at once.
 
     Returns
     -------
     List[Path]
         New filename locations
     """
-    if isinstance(filenames, Path):
-        filenames = [filenames]
-
-    outnames = [outdir / fname.name for fname in filenames]
+    return stage_files(filenames, outdir, strategy=strategy, workers=workers)
 
-    for inname, outname in zip(filenames, outnames):
-        subprocess.check_output(f"rsync -rz {inname}/ {outname}", shell=True)
-
-    return outnames
-
-
-# TODO take a time and compute the beam attenuation?
-def generate_componentlist(componentlist_name: Path, beam: Beam):
-    src_list = [
-        {
-            "label": "Cas A",
-            "flux": 16530,
-            "alpha": -0.72,
-            "ref_freq": 80.0,  # MHz
-            "position": "J2000 23h23m24s +58d48m54s",
-        },
-        {
-            "label": "Cyg A",
-            "flux": 16300,
-            "alpha": -0.58,
-            "ref_freq": 80.00,  # MHz
-            "position": "J2000 19h59m28.35663s +40d44m02.0970s",
-        },
-        {
-            "label": "Tau A",
-            "flux": 1770,
-            "alpha": -0.27,
-            "ref_freq": 80.00,  # MHz
-            "position": "J2000 05h34m31.94s +22d00m52.2s",
-        },
-        {
-            "label": "Vir A",
-            "flux": 2400,
-            "alpha": -0.86,
-            "ref_freq": 80.00,  # MHz
-            "position": "J2000 12h30m49.42338s +12d23m28.0439s",
-        },
-    ]
-
-    cl = componentlist()
-    cl.done()
-    for src in src_list:
-        cl.addcomponent(
-            flux=beam.apply_beam(src),
-            polarization="Stokes",
-            dir=src["position"],
-            index=[src["alpha"], 0, 0, 0],
-            spectrumtype="spectral index",
-            freq=f"{beam.freq:.2f}MHz",
-            label=src["label"],
-        )
 
-    cl.rename(str(componentlist_name))
-    cl.done()
+def generate_componentlist(componentlist_name: Path, beam: "Beam"):
+    # beam attenuation of every source from one transform and beam lookup
+    fluxes = beam.apply_beams(CALIBRATOR_SOURCES)
+    write_componentlist(componentlist_name, CALIBRATOR_SOURCES, fluxes, beam.freq)
 
 
 def plot_snapshot(filename: List[Path], outname: str):
     """Plot the input snapshot with WCS and timestamp"""
+    from .render import get_renderer
 
-    if "highband" in outname:
-        norm = Normalize(vmin=-5, vmax=50)
-    else:
-        norm = Normalize(vmin=-5, vmax=250)
-
-    hdu = fits.open(filename[0])[0]
-    central_freq = hdu.header["CRVAL3"] / 1e6
-    hdu.header["TIMESYS"] = "utc"
-    hdu.header["RADESYSa"] = "ICRS"
-    wcs = WCS(hdu.header).slice(np.s_[0, 0])  # .dropaxis(3).dropaxis(2)
-
-    obstime = Time(
-        hdu.header["DATE-OBS"],
-        format="isot",
-        scale="utc",
-        location=OVRO_LOCATION,
-    )
-    ovro_altaz = AltAz(obstime=obstime, location=OVRO_LOCATION)
-
-    fig, axes = plt.subplots(
-        1,
-        2,
-        dpi=200,
-        figsize=(6.4, 3.5),
-        sharex=True,
-        sharey=True,
-        subplot_kw={"projection": wcs},
-    )
+    get_renderer(highband="highband" in outname).save(filename, outname)
 
-    axes[0].imshow(hdu.data[0, 0, :, :], norm=norm, origin="lower", aspect="equal")
-    axes[0].set_title("I")
-
-    hdu = fits.open(filename[1])[0]
-    axes[1].imshow(hdu.data[0, 0, :, :] * 10, norm=norm, origin="lower")
-    axes[1].set_title("V * 10")
-
-    for body in ["Sun", "Moon", "Jupiter"]:
-        body_coord = get_body(body, obstime).transform_to(ovro_altaz)
-        # WSClean writes things in FK5 which is barycentric despite the fact we're observing
-        # from eath so the FK5 will project to the wrong spot.
-        # This is worked around by ignoring their distance
-
-        body_coord = SkyCoord(alt=body_coord.alt, az=body_coord.az, frame=ovro_altaz)
-        pixel_coord = wcs.world_to_pixel(body_coord)
-
-        for ax in axes:
-            ax.plot_coord(
-                body_coord,
-                marker="o",
-                ms=3,
-                markerfacecolor="none",
-                markeredgewidth=0.5,
-                color="white",
-            )
-            ax.annotate(
-                body.capitalize(),
-                pixel_coord,
-                color="white",
-                fontsize="xx-small",
-                horizontalalignment="right",
-                verticalalignment="bottom",
-            )
 
-    for source, coord in ATEAM_SOURCES.items():
-        pixel_coords = wcs.world_to_pixel(coord)
-        for ax in axes:
-            ax.plot_coord(
-                coord,
-                marker="o",
-                ms=3,
-                markerfacecolor="none",
-                markeredgewidth=0.5,
-                color="white",
-            )
-            ax.annotate(
-                source,
-                pixel_coords,
-                color="white",
-                fontsize="xx-small",
-                horizontalalignment="right",
-                verticalalignment="bottom",
-            )
+def render_snapshot(
+    filename: List[Path],
+    highband: bool,
+    downsample: int = 1,
+    ephemeris: "BodyEphemeris" = None,
+) -> np.ndarray:
+    """Render the plot of a snapshot to an RGB image.
 
-    fig.text(
-        0.5,
-        0.075,
-        hdu.header["DATE-OBS"] + " UTC",
-        horizontalalignment="center",
-        backgroundcolor="k",
-        color="w",
-        verticalalignment="center",
-    )
-    for ax in axes:
-        xmax = ax.get_xlim()[1]
-        ymax = ax.get_ylim()[1]
-        ax.text(
-            xmax // 2,
-            -150,
-            "S",
-            horizontalalignment="center",
-            verticalalignment="center",
-        )
-        ax.text(
-            -150,
-            ymax // 2,
-            "E",
-            horizontalalignment="center",
-            verticalalignment="center",
-        )
-        ax.text(
-            xmax + 150,
-            ymax // 2,
-            "W",
-            horizontalalignment="center",
-            verticalalignment="center",
-        )
+    Parameters
+    ----------
+    filename : List[Path]
+        The Stokes I and V FITS images.
+    highband : bool
+        Use the color scale of the high band.
+    downsample : int
+        Average the images in blocks of downsample x downsample pixels first.
+    ephemeris : BodyEphemeris
+        Precomputed positions of the marked solar system bodies.
 
-    bandname = NAME_REGEX.match(filename[0]).group("name")
-    plt.suptitle(hdu.header["TELESCOP"] + f"\n{bandname} {central_freq:.3f}MHz")
-    plt.savefig(outname)
-    plt.close()
+    Returns
+    -------
+    np.ndarray
+        The plot as a (height, width, 3) uint8 array, e.g. a movie frame.
+    """
+    from .render import get_renderer
+
+    return get_renderer(highband, downsample=downsample).render(
+        filename, ephemeris=ephemeris
+    )
 
 
 def check_for_bcal(date_str: str, subbands: List[str]):
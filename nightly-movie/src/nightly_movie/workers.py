@@ -0,0 +1,141 @@
+# -*- mode: python; coding: utf-8 -*-
+# Copyright (c) 2024, Owens Valley Radio Observatory Long Wavelength Array
+# All rights reserved.
+
+import importlib
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Union
+
+
+class FileTaskError(RuntimeError):
+    """Raised when a task failed on one or more files.
+
+    Parameters
+    ----------
+    name : str
+        Name of the task.
+    failures : dict
+        The exception raised for each file which failed.
+    """
+
+    def __init__(self, name: str, failures: dict):
+        self.name = name
+        self.failures = failures
+        super().__init__(
+            f"{name} failed for {len(failures)} file(s):\n"
+            + "\n".join(f"\t{fname}: {err!r}" for fname, err in failures.items())
+        )
+
+
+def casa_pool(workers: int) -> ProcessPoolExecutor:
+    """Create a process pool to run CASA tasks in.
+
+    CASA is not thread safe, and forking a process which already loaded
+    casatools is not safe either, so workers are started with spawn.
+    Each worker imports CASA once and is reused for every task.
+    """
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _import_renderer():
+    importlib.import_module("matplotlib.backends.backend_agg")
+    importlib.import_module(".render", __package__)
+
+
+def render_pool(workers: int) -> ProcessPoolExecutor:
+    """Create a process pool to render frames in, kept for a whole run.
+
+    Workers are started with spawn, since forking the threaded pipeline is
+    not safe, and import matplotlib and the renderer once when they start.
+    Each worker then keeps its figures between frames.
+    """
+    return ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_import_renderer,
+    )
+
+
+def _timed(function: Callable, filename: Union[str, Path]):
+    tstart = time.perf_counter()
+    result = function(filename)
+    return result, time.perf_counter() - tstart
+
+
+def map_files(
+    function: Callable,
+    filenames: List[Union[str, Path]],
+    executor: Executor = None,
+    name: str = None,
+    verbose: bool = True,
+) -> List:
+    """Run a function on every file, concurrently if an executor is given.
+
+    Every file is attempted even if some fail. Failures are raised together
+    once all files are done.
+
+    Parameters
+    ----------
+    function : Callable
+        Called with each filename. Must be picklable to use a process pool.
+    filenames : List[str | Path]
+        The files to run on.
+    executor : Executor
+        Pool to run function in. Runs in this process one file at a time if None.
+    name : str
+        Name of the task in progress messages. Defaults to the function name.
+    verbose : bool
+        Print the time taken for each file.
+
+    Returns
+    -------
+    List
+        The return value of function for each file.
+
+    Raises
+    ------
+    FileTaskError
+        If function raised for any of the files.
+    """
+    if name is None:
+        name = getattr(function, "__name__", None) or function.func.__name__
+
+    if executor is None:
+        outcomes = []
+        for filename in filenames:
+            try:
+                outcomes.append(_timed(function, filename))
+            except Exception as err:
+                outcomes.append(err)
+    else:
+        futures = [
+            executor.submit(_timed, function, filename) for filename in filenames
+        ]
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as err:
+                outcomes.append(err)
+
+    results = []
+    failures = {}
+    for filename, outcome in zip(filenames, outcomes):
+        if isinstance(outcome, Exception):
+            failures[filename] = outcome
+            if verbose:
+                print(f"\t{name} {Path(filename).name} failed: {outcome!r}")
+            continue
+
+        result, seconds = outcome
+        results.append(result)
+        if verbose:
+            print(f"\t{name} {Path(filename).name} took {seconds:.1f}s")
+
+    if len(failures) > 0:
+        raise FileTaskError(name, failures)
+
+    return results
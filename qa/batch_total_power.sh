@@ -29,6 +29,16 @@ else
     exit $ec
 fi
 echo $(which python)
+
+# catalog the night once, before the array starts, so the tasks only read it
+# submit this script without --array, it submits the array itself
+if [ -z "${SLURM_ARRAY_TASK_ID}" ]; then
+    if [ -n "${OVRO_MS_CATALOG}" ]; then
+        ovro_ms_catalog ${OVRO_MS_CATALOG} $(dirname $(dirname $1)) ${date_str} > /dev/null
+    fi
+    sbatch --array=0-99 ~/src/ovro-cd-tools/qa/batch_total_power.sh $1
+    exit 0
+fi
 #RUN SCRIPT
 # use slurm env variables to divide over list of input files
 #ALLFILES=$(ls -d $1/*/*ms) #this pathing works with 2025 pipeline structure Band/day/hour/*.ms
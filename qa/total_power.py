@@ -24,7 +24,29 @@ for chunk in inputfilename.split('MHz')[:-1]:
     print(chunk)
     subbandglob.append(chunk[:-2]+'*')
 subbandglob = ''.join(subbandglob)+inputfilename.split('MHz')[-1]
-bandfiles = glob(subbandglob)
+
+# if OVRO_MS_CATALOG points at an ovro_ms_catalog database (from nightly_movie)
+# look the other subbands up there instead of globbing across lustre.
+# the catalog is only read here, batch_total_power.sh updates it once per night.
+# works with both the band/day/*.ms and band/day/hour/*.ms layouts, the
+# glob is used if the catalog has no files for the integration
+bandfiles = []
+catalog_path = os.environ.get('OVRO_MS_CATALOG')
+if catalog_path is not None:
+    import sqlite3
+    from nightly_movie.filecatalog import DATE_DIR_REGEX, MSCatalog
+    daydir = os.path.dirname(os.path.abspath(inputfilename))
+    if DATE_DIR_REGEX.match(os.path.basename(daydir)) is None:
+        daydir = os.path.dirname(daydir)
+    datapath = os.path.dirname(os.path.dirname(daydir))
+    obstime = '_'.join(os.path.basename(os.path.normpath(inputfilename)).split('_')[:2])
+    try:
+        with MSCatalog(catalog_path, readonly=True) as catalog:
+            bandfiles = [str(f) for f in catalog.integration(datapath, obstime)]
+    except sqlite3.OperationalError as err:
+        print(f'could not read the catalog {catalog_path}, using glob: {err}')
+if len(bandfiles) == 0:
+    bandfiles = glob(subbandglob)
 outfile = os.path.basename(inputfilename).split('_')
 outfile = 'tp.'+'_'.join([outfile[0],outfile[1]])+'.npz'
 print(outfile)